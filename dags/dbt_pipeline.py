@@ -3,8 +3,8 @@ from airflow.operators.bash import BashOperator
 from airflow.sensors.python import PythonSensor
 from cosmos import DbtTaskGroup, ProjectConfig, ProfileConfig, ExecutionConfig
 from datetime import datetime
-import glob
 import os
+import pathlib
 
 # --- CONFIGURATION ---
 DBT_PROJECT_PATH = os.path.join(
@@ -14,12 +14,24 @@ DBT_PROJECT_PATH = os.path.join(
 # --- LOAD ENV VARS MANUALLY (Fallback) ---
 # Because Airflow might not load .env automatically in all contexts
 env_path = os.path.join(os.environ.get("AIRFLOW_HOME", "/usr/local/airflow"), ".env")
-if os.path.exists(env_path):
-    with open(env_path, "r") as f:
-        for line in f:
-            if line.strip() and not line.startswith("#"):
-                key, value = line.strip().split("=", 1)
-                os.environ[key] = value.strip('"').strip("'")
+
+
+def _load_env_file(path: str) -> None:
+    """Load KEY=VALUE pairs from path into os.environ."""
+    if not os.path.exists(path):
+        return
+    # Split/partition on bytes so the per-line work stays in C
+    data = pathlib.Path(path).read_bytes()
+    for line in data.splitlines():
+        line = line.strip()
+        if not line or line[:1] == b"#":
+            continue
+        key, sep, value = line.partition(b"=")
+        if sep:
+            os.environ[key.decode()] = value.strip(b'"').strip(b"'").decode()
+
+
+_load_env_file(env_path)
 
 default_args = {
     "owner": "airflow",
@@ -33,9 +45,11 @@ RAW_DATA_PATH = os.path.join(
 
 def check_for_csv_files() -> bool:
     """Check if any CSV files exist in the raw_data directory."""
-    csv_pattern = os.path.join(RAW_DATA_PATH, "*.csv")
-    files = glob.glob(csv_pattern)
-    return len(files) > 0
+    if not os.path.isdir(RAW_DATA_PATH):
+        return False
+    # Stop at the first match instead of listing the whole directory
+    with os.scandir(RAW_DATA_PATH) as it:
+        return any(e.name.endswith(".csv") and e.is_file() for e in it)
 
 
 with DAG(
@@ -66,11 +80,19 @@ with DAG(
         ),
         env={
             "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY", ""),
-            "ETL_LOW_MEMORY_MODE": os.environ.get("ETL_LOW_MEMORY_MODE", "false"),
-            "ETL_ROW_GROUP_SIZE": os.environ.get("ETL_ROW_GROUP_SIZE", "250000"),
+            "ETL_LOW_MEMORY_MODE": os.environ.get("ETL_LOW_MEMORY_MODE", "auto"),
+            "ETL_ROW_GROUP_SIZE": os.environ.get("ETL_ROW_GROUP_SIZE", "500000"),
             "AIRFLOW_HOME": os.environ.get("AIRFLOW_HOME", "/usr/local/airflow"),
-            "PARQUET_COMPRESSION": os.environ.get("PARQUET_COMPRESSION", "snappy"),
+            "PARQUET_COMPRESSION": os.environ.get("PARQUET_COMPRESSION", "zstd"),
+            "PARQUET_COMPRESSION_LEVEL": os.environ.get("PARQUET_COMPRESSION_LEVEL", "3"),
             "ETL_ENABLE_ROW_HASH": os.environ.get("ETL_ENABLE_ROW_HASH", "true"),
+            "ETL_ROW_HASH_ALGORITHM": os.environ.get("ETL_ROW_HASH_ALGORITHM", "legacy"),
+            "ETL_MAX_WORKERS": os.environ.get("ETL_MAX_WORKERS", "0"),
+            "ETL_COMBINE_FILES": os.environ.get("ETL_COMBINE_FILES", "false"),
+            "ETL_SCHEMA_CACHE_PATH": os.environ.get(
+                "ETL_SCHEMA_CACHE_PATH",
+                os.path.join(os.path.expanduser("~"), ".cache", "etl_processor", "schema_cache.json"),
+            ),
             # Pass DAG run ID for stats tracking
             "AIRFLOW_RUN_ID": "{{ run_id }}",
         },
@@ -96,6 +118,16 @@ with DAG(
             "GCP_TABLE_ID": os.environ.get("GCP_TABLE_ID", "smart_meters_clean"),
             "GCS_UPLOAD_CHUNK_SIZE_MB": os.environ.get("GCS_UPLOAD_CHUNK_SIZE_MB", "10"),
             "GCS_UPLOAD_TIMEOUT": os.environ.get("GCS_UPLOAD_TIMEOUT", "300"),
+            "GCS_PARALLEL_UPLOAD": os.environ.get("GCS_PARALLEL_UPLOAD", "false"),
+            "GCS_PARALLEL_UPLOAD_MIN_SIZE_MB": os.environ.get("GCS_PARALLEL_UPLOAD_MIN_SIZE_MB", "32"),
+            "GCS_PARALLEL_UPLOAD_WORKERS": os.environ.get("GCS_PARALLEL_UPLOAD_WORKERS", "8"),
+            "GCS_UPLOAD_CONCURRENCY": os.environ.get("GCS_UPLOAD_CONCURRENCY", "8"),
+            "CLOUD_LOADER_WORKERS": os.environ.get("CLOUD_LOADER_WORKERS", "8"),
+            "BQ_BATCH_LOAD": os.environ.get("BQ_BATCH_LOAD", "true"),
+            "BQ_BATCH_MAX_FILES": os.environ.get("BQ_BATCH_MAX_FILES", "0"),
+            "BQ_USE_EXTERNAL_SOURCE": os.environ.get("BQ_USE_EXTERNAL_SOURCE", "false"),
+            "BQ_SCRIPT_LOAD": os.environ.get("BQ_SCRIPT_LOAD", "true"),
+            "BQ_COMPUTE_ROW_HASH": os.environ.get("BQ_COMPUTE_ROW_HASH", "false"),
             "AIRFLOW_HOME": os.environ.get("AIRFLOW_HOME", "/usr/local/airflow"),
             # Pass DAG run ID for stats tracking
             "AIRFLOW_RUN_ID": "{{ run_id }}",
@@ -1,15 +1,22 @@
+import base64
 import os
-import glob
-import json
+import functools
+import hashlib
 import logging
+import re
 import sys
+import threading
 import time
-import uuid
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
+import pyarrow.feather as feather
+import google_crc32c
 from google.cloud import storage
 from google.cloud import bigquery
+from google.api_core.exceptions import NotFound, PreconditionFailed
+from google.cloud.storage import transfer_manager
 
 from pipeline_stats import (
     StageStats,
@@ -27,6 +34,37 @@ TABLE_ID = os.getenv("GCP_TABLE_ID", "smart_meters_clean")
 # Performance Tuning
 UPLOAD_CHUNK_SIZE_MB = int(os.getenv("GCS_UPLOAD_CHUNK_SIZE_MB", "10"))
 UPLOAD_TIMEOUT = int(os.getenv("GCS_UPLOAD_TIMEOUT", "300"))
+# Files below this size are sent in one request (no chunk buffer); larger files
+# keep resumable chunked uploads so a dropped connection only retries one chunk
+SINGLE_REQUEST_UPLOAD_MAX_BYTES = 5 * 1024 * 1024
+GCS_CHUNK_ALIGNMENT = 256 * 1024
+# Read size when checksumming local files against existing blobs
+CRC32C_READ_SIZE = 1024 * 1024
+# Parallel multipart upload for large files (each part is a separate connection)
+PARALLEL_UPLOAD = os.getenv("GCS_PARALLEL_UPLOAD", "false").lower() == "true"
+PARALLEL_UPLOAD_MIN_SIZE_MB = int(os.getenv("GCS_PARALLEL_UPLOAD_MIN_SIZE_MB", "32"))
+PARALLEL_UPLOAD_WORKERS = int(os.getenv("GCS_PARALLEL_UPLOAD_WORKERS", "8"))
+# Files uploaded to GCS concurrently (network-bound, so threads are enough)
+UPLOAD_CONCURRENCY = int(os.getenv("GCS_UPLOAD_CONCURRENCY", "8"))
+# BigQuery loads run concurrently in per-file mode
+CLOUD_LOADER_WORKERS = int(os.getenv("CLOUD_LOADER_WORKERS", "8"))
+# Load all uploaded files with one BigQuery load job (stats recorded as "all_files")
+BATCH_LOAD = os.getenv("BQ_BATCH_LOAD", "true").lower() == "true"
+# Max files per batched load; 0 waits for every upload and loads them all at once.
+# A limit lets earlier batches load while later files are still uploading.
+BATCH_MAX_FILES = int(os.getenv("BQ_BATCH_MAX_FILES", "0"))
+# Read parquet from GCS as an external source instead of loading a temp table first
+USE_EXTERNAL_SOURCE = os.getenv("BQ_USE_EXTERNAL_SOURCE", "false").lower() == "true"
+EXTERNAL_SOURCE_NAME = "incoming_parquet"
+# Compute ROW_HASH in BigQuery instead of taking it from the parquet files (pair with
+# ETL_ENABLE_ROW_HASH=false). When off, files without ROW_HASH are appended as-is.
+COMPUTE_ROW_HASH = os.getenv("BQ_COMPUTE_ROW_HASH", "false").lower() == "true"
+# Natural-key hash computed in BigQuery; same key as the ETL hash (METER_ID + DATA_TIME)
+ROW_HASH_SQL = "FARM_FINGERPRINT(CONCAT(CAST(METER_ID AS STRING), '|', CAST(DATA_TIME AS STRING)))"
+# Once the target table exists, load + dedup INSERT + cleanup run as one BigQuery script
+USE_SCRIPT_LOAD = os.getenv("BQ_SCRIPT_LOAD", "true").lower() == "true"
+# Lifetime of temp tables left behind by failed or killed loads
+TEMP_TABLE_TTL_HOURS = 6
 
 AIRFLOW_HOME = os.getenv("AIRFLOW_HOME", "/usr/local/airflow")
 LOCAL_OUTPUT_DIR = os.path.join(AIRFLOW_HOME, "include/processed_data")
@@ -43,38 +81,262 @@ formatter = logging.Formatter(
 handler.setFormatter(formatter)
 logger.addHandler(handler)
 
-logger.info(
-    f"Cloud Config: Project={PROJECT_ID}, Bucket={BUCKET_NAME}, ChunkSize={UPLOAD_CHUNK_SIZE_MB}MB"
-)
 
+@functools.lru_cache(maxsize=1)
+def _gcs() -> storage.Client:
+    """Shared storage client so the HTTP session and ADC token are reused across files."""
+    return storage.Client(project=PROJECT_ID)
+
+
+@functools.lru_cache(maxsize=1)
+def _bq() -> bigquery.Client:
+    """Shared BigQuery client so the HTTP session and ADC token are reused across files."""
+    return bigquery.Client(project=PROJECT_ID)
+
+
+def list_existing_blobs(bucket_name: str, prefix: str) -> dict[str, storage.Blob]:
+    """
+    Lists blobs under prefix once so per-file existence checks are in-memory.
+    Returns {blob_name: Blob}; each listed Blob carries its crc32c and generation.
+    """
+    return {b.name: b for b in _gcs().bucket(bucket_name).list_blobs(prefix=prefix)}
 
-def upload_to_gcs(bucket_name, source_file, destination_blob_name):
-    """Uploads a file to the bucket with high-speed chunking, skipping if exists."""
+
+def file_crc32c(path: str) -> str:
+    """Computes the base64 CRC32C of a local file, in the same format GCS reports it."""
+    checksum = google_crc32c.Checksum()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CRC32C_READ_SIZE), b""):
+            checksum.update(chunk)
+    return base64.b64encode(checksum.digest()).decode("ascii")
+
+
+def upload_chunk_size(file_size: int) -> Optional[int]:
+    """
+    Picks the resumable-upload chunk size for a file so small files don't allocate
+    a full UPLOAD_CHUNK_SIZE_MB buffer. Returns None (single-request upload) for
+    files under SINGLE_REQUEST_UPLOAD_MAX_BYTES. Chunk sizes are multiples of 256 KiB,
+    as GCS requires.
+    """
+    default_chunk = UPLOAD_CHUNK_SIZE_MB * 1024 * 1024
+    if file_size < SINGLE_REQUEST_UPLOAD_MAX_BYTES:
+        return None
+    if file_size < default_chunk:
+        return (file_size // GCS_CHUNK_ALIGNMENT + 1) * GCS_CHUNK_ALIGNMENT
+    return default_chunk
+
+
+def upload_to_gcs(bucket_name, source_file, destination_blob_name, existing: dict[str, storage.Blob]):
+    """Uploads a file to the bucket with high-speed chunking, skipping if identical content exists."""
     try:
         # ADC: uses default credentials from environment (GOOGLE_APPLICATION_CREDENTIALS)
-        storage_client = storage.Client(project=PROJECT_ID)
-        bucket = storage_client.bucket(bucket_name)
+        bucket = _gcs().bucket(bucket_name)
         blob = bucket.blob(destination_blob_name)
 
-        if blob.exists():
+        # Conditional write: 0 means "only create", otherwise only replace the exact
+        # generation we listed. A concurrent writer makes the upload fail with
+        # PreconditionFailed instead of one upload silently overwriting the other.
+        if_generation_match = 0
+
+        if destination_blob_name in existing:
+            remote_blob = existing[destination_blob_name]
+            if_generation_match = remote_blob.generation
+            # Only hash files whose name already exists remotely
+            if remote_blob.crc32c and remote_blob.crc32c == file_crc32c(source_file):
+                logger.info(
+                    f"Skipping {source_file}: Identical content already at gs://{bucket_name}/{destination_blob_name}"
+                )
+                return f"gs://{bucket_name}/{destination_blob_name}"
             logger.info(
-                f"Skipping {source_file}: Already exists at gs://{bucket_name}/{destination_blob_name}"
+                f"Content changed for gs://{bucket_name}/{destination_blob_name}; re-uploading."
             )
-            return f"gs://{bucket_name}/{destination_blob_name}"
 
         logger.info(
             f"Uploading {source_file} to gs://{bucket_name}/{destination_blob_name}..."
         )
 
-        blob.chunk_size = UPLOAD_CHUNK_SIZE_MB * 1024 * 1024
-        blob.upload_from_filename(source_file, timeout=UPLOAD_TIMEOUT)
+        chunk_size = UPLOAD_CHUNK_SIZE_MB * 1024 * 1024
+        file_size = os.path.getsize(source_file)
+
+        if PARALLEL_UPLOAD and file_size > PARALLEL_UPLOAD_MIN_SIZE_MB * 1024 * 1024:
+            # Slices the file and uploads the parts over parallel connections.
+            # The XML multipart API behind upload_chunks_concurrently takes no
+            # preconditions, so if_generation_match can't be passed; check the
+            # generation right before uploading instead. A write that lands while
+            # the parts are uploading is not caught.
+            current = bucket.get_blob(destination_blob_name)
+            if (current.generation if current else 0) != if_generation_match:
+                raise PreconditionFailed(
+                    f"gs://{bucket_name}/{destination_blob_name} changed since it was listed"
+                )
+            logger.info(f"Using parallel chunked upload ({PARALLEL_UPLOAD_WORKERS} workers)")
+            transfer_manager.upload_chunks_concurrently(
+                source_file,
+                blob,
+                chunk_size=chunk_size,
+                max_workers=PARALLEL_UPLOAD_WORKERS,
+                worker_type=transfer_manager.THREAD,
+                deadline=UPLOAD_TIMEOUT,
+            )
+        else:
+            blob.chunk_size = upload_chunk_size(file_size)
+            blob.upload_from_filename(
+                source_file,
+                timeout=UPLOAD_TIMEOUT,
+                if_generation_match=if_generation_match,
+            )
         logger.info("Upload complete.")
         return f"gs://{bucket_name}/{destination_blob_name}"
+    except PreconditionFailed:
+        logger.info(
+            f"Skipping {source_file}: gs://{bucket_name}/{destination_blob_name} was written since it was listed"
+        )
+        return f"gs://{bucket_name}/{destination_blob_name}"
     except Exception as e:
         logger.error(f"Upload failed: {e}")
         return None
 
 
+_target_table_lock = threading.Lock()
+# Temp-table expiry/deletes run here so they don't block the next step
+_cleanup_executor = ThreadPoolExecutor(max_workers=2)
+
+
+def _query_config(
+    table_definitions: Optional[dict] = None,
+    query_parameters: Optional[list] = None,
+) -> bigquery.QueryJobConfig:
+    """Builds a QueryJobConfig carrying external table definitions and/or query parameters."""
+    job_config = bigquery.QueryJobConfig()
+    if table_definitions:
+        job_config.table_definitions = table_definitions
+    if query_parameters:
+        job_config.query_parameters = query_parameters
+    return job_config
+
+
+def _delete_temp_table(temp_table_id: str) -> None:
+    """Deletes a temp table; runs on the background cleanup executor."""
+    try:
+        _bq().delete_table(temp_table_id, not_found_ok=True)
+        logger.info(f"Cleaned up temp table {temp_table_id}.")
+    except Exception as e:
+        logger.warning(f"Failed to delete temp table {temp_table_id}: {e}")
+
+
+def _expire_temp_table(temp_table_id: str) -> None:
+    """
+    Sets an expiration on a freshly loaded temp table. It is normally deleted after
+    the INSERT; the expiration covers failed or killed runs (a retry within the
+    TTL can still reuse the table).
+    """
+    try:
+        table = bigquery.Table(temp_table_id)
+        table.expires = datetime.now(timezone.utc) + timedelta(hours=TEMP_TABLE_TTL_HOURS)
+        _bq().update_table(table, ["expires"])
+        logger.info(f"Temp table {temp_table_id} expires in {TEMP_TABLE_TTL_HOURS}h.")
+    except NotFound:
+        pass
+    except Exception as e:
+        logger.warning(f"Failed to set expiration on temp table {temp_table_id}: {e}")
+
+
+def _written_after(table: bigquery.Table, uris: list[str]) -> bool:
+    """
+    True if table was created after every source blob was last written, i.e. it
+    was loaded from the files as they are now. A missing blob counts as newer.
+    """
+    for uri in uris:
+        bucket_name, _, blob_name = uri[len("gs://"):].partition("/")
+        blob = _gcs().bucket(bucket_name).get_blob(blob_name)
+        if blob is None or blob.updated is None or blob.updated >= table.created:
+            return False
+    return True
+
+
+def temp_table_name(run_id: str, uri: str | list[str]) -> str:
+    """
+    Deterministic temp table name for a run and set of source URIs, so a retried
+    task lands on the same table. Run IDs contain characters BigQuery doesn't
+    allow in table names (':', '+', '-'), so they are replaced with '_'.
+    """
+    uris = [uri] if isinstance(uri, str) else sorted(uri)
+    digest = hashlib.blake2b("\n".join(uris).encode(), digest_size=6).hexdigest()
+    safe_run_id = re.sub(r"[^A-Za-z0-9_]", "_", run_id)
+    return f"temp_{safe_run_id}_{digest}"
+
+
+def _sql_string(value: str) -> str:
+    """Quotes a value as a BigQuery string literal."""
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def load_with_script(
+    bq_client: bigquery.Client,
+    uris: list[str],
+    temp_table_id: str,
+    target_table: bigquery.Table,
+) -> tuple[int, int]:
+    """
+    Loads parquet into the temp table, runs the ROW_HASH dedup INSERT into an existing
+    target and drops the temp table, all in one BigQuery script (one request, one
+    wait). The column list is read from the loaded temp table inside the script;
+    ROW_HASH comes from the files, or is computed in the script when COMPUTE_ROW_HASH
+    is set.
+    The temp table is created with an expiration so a failed script cleans itself up.
+
+    Returns:
+        Tuple of (rows loaded, rows inserted)
+    """
+    project, dataset, temp_name = temp_table_id.split(".")
+    time_type = next(f.field_type for f in target_table.schema if f.name == "DATA_TIME")
+    target_ref = f"`{target_table.project}.{target_table.dataset_id}.{target_table.table_id}`"
+    uri_list = ", ".join(_sql_string(u) for u in uris)
+    row_hash_expr = ROW_HASH_SQL if COMPUTE_ROW_HASH else "ROW_HASH"
+
+    script = f"""
+    DECLARE loaded INT64;
+    DECLARE inserted INT64;
+    DECLARE cols STRING;
+    DECLARE lo {time_type};
+    DECLARE hi {time_type};
+
+    LOAD DATA OVERWRITE `{temp_table_id}`
+    OPTIONS (expiration_timestamp = TIMESTAMP_ADD(CURRENT_TIMESTAMP(), INTERVAL {TEMP_TABLE_TTL_HOURS} HOUR))
+    FROM FILES (format = 'PARQUET', uris = [{uri_list}]);
+
+    SET loaded = (SELECT COUNT(*) FROM `{temp_table_id}`);
+    IF loaded = 0 THEN
+      RAISE USING MESSAGE = 'BigQuery load completed but 0 rows loaded';
+    END IF;
+
+    SET cols = (
+      SELECT STRING_AGG(FORMAT('`%s`', column_name), ', ' ORDER BY ordinal_position)
+      FROM `{project}.{dataset}`.INFORMATION_SCHEMA.COLUMNS
+      WHERE table_name = {_sql_string(temp_name)} AND column_name != 'ROW_HASH'
+    );
+    SET (lo, hi) = (SELECT AS STRUCT MIN(DATA_TIME), MAX(DATA_TIME) FROM `{temp_table_id}`);
+
+    EXECUTE IMMEDIATE FORMAT(\"\"\"
+      INSERT {target_ref} (%s, ROW_HASH)
+      SELECT %s, ROW_HASH
+      FROM (SELECT %s, {row_hash_expr} AS ROW_HASH FROM `{temp_table_id}`) AS S
+      WHERE NOT EXISTS (
+        SELECT 1 FROM {target_ref} T
+        WHERE T.ROW_HASH = S.ROW_HASH
+        AND T.DATA_TIME BETWEEN @lo AND @hi
+      )
+    \"\"\", cols, cols, cols) USING lo AS lo, hi AS hi;
+    SET inserted = @@row_count;
+
+    DROP TABLE `{temp_table_id}`;
+
+    SELECT loaded, inserted;
+    """
+    row = next(iter(bq_client.query(script).result()))
+    return row.loaded, row.inserted
+
+
 def create_partitioned_table(bq_client, target_table_id, schema):
     """Creates a partitioned and clustered table for optimal query performance."""
     table = bigquery.Table(target_table_id, schema=schema)
@@ -94,7 +356,7 @@ def create_partitioned_table(bq_client, target_table_id, schema):
 
 
 def load_gcs_to_bigquery(
-    uri: str,
+    uri: str | list[str],
     dataset_id: str,
     table_id: str,
     source_filename: str,
@@ -103,88 +365,226 @@ def load_gcs_to_bigquery(
 ) -> tuple[bool, Optional[StageStats]]:
     """
     Loads data from GCS into BigQuery using INSERT with dedup for better performance.
+    A list of URIs is loaded with a single load job and a single INSERT.
     
     Returns:
         Tuple of (success: bool, stats: StageStats or None)
     """
-    logger.info(f"Loading {uri} into BigQuery with deduplication...")
+    if not isinstance(uri, str):
+        uri = list(uri)
+        uri_desc = uri[0] if len(uri) == 1 else f"{len(uri)} files"
+    else:
+        uri_desc = uri
+    logger.info(f"Loading {uri_desc} into BigQuery with deduplication...")
     t0 = time.time()
     
     rows_input = 0
     rows_inserted = 0
     rows_duplicates_skipped = 0
+    temp_table_id = None
 
     try:
         # ADC: uses default credentials
-        bq_client = bigquery.Client(project=PROJECT_ID)
+        bq_client = _bq()
 
         target_table_id = f"{PROJECT_ID}.{dataset_id}.{table_id}"
-        temp_table_id = f"{PROJECT_ID}.{dataset_id}.temp_{uuid.uuid4().hex[:8]}"
+        table_definitions = None
+
+        if USE_EXTERNAL_SOURCE:
+            # 1. Query the parquet files in place through a temporary external table
+            # definition - no load job, no temp table to write, read back and delete.
+            external_config = bigquery.ExternalConfig("PARQUET")
+            external_config.source_uris = [uri] if isinstance(uri, str) else uri
+            table_definitions = {EXTERNAL_SOURCE_NAME: external_config}
+            source_ref = EXTERNAL_SOURCE_NAME
+
+            # Dry run resolves the parquet schema without reading any data
+            dry_config = _query_config(table_definitions)
+            dry_config.dry_run = True
+            source_schema = bq_client.query(f"SELECT * FROM {source_ref}", job_config=dry_config).schema
+
+            count_job = bq_client.query(
+                f"SELECT COUNT(*) AS n FROM {source_ref}",
+                job_config=_query_config(table_definitions),
+            )
+            loaded_rows = next(iter(count_job.result())).n or 0
+            rows_input = loaded_rows
+            if loaded_rows == 0:
+                raise RuntimeError(f"External source has 0 rows for {uri_desc}")
+            logger.info(f"Reading {loaded_rows} rows directly from {uri_desc} (external source)")
+        else:
+            temp_table_id = f"{PROJECT_ID}.{dataset_id}.{temp_table_name(run_id, uri)}"
+            source_ref = f"`{temp_table_id}`"
+
+            if USE_SCRIPT_LOAD:
+                # Once the target exists with ROW_HASH, the whole load runs as one script
+                target_table = None
+                try:
+                    target_table = bq_client.get_table(target_table_id)
+                except NotFound:
+                    pass
+                target_fields = {f.name for f in target_table.schema} if target_table else set()
+                if {"ROW_HASH", "DATA_TIME"} <= target_fields:
+                    try:
+                        loaded_rows, rows_inserted = load_with_script(
+                            bq_client, [uri] if isinstance(uri, str) else uri, temp_table_id, target_table
+                        )
+                    except Exception as e:
+                        # e.g. scripting unavailable on the project; the step-by-step path
+                        # below is safe to rerun because its INSERT dedups on ROW_HASH
+                        logger.warning(f"Scripted load failed for {uri_desc}, falling back: {e}")
+                    else:
+                        rows_input = loaded_rows
+                        rows_duplicates_skipped = loaded_rows - rows_inserted
+                        logger.info(
+                            f"Inserted {rows_inserted} new rows into {target_table_id} from {uri_desc} "
+                            f"in one script (skipped {rows_duplicates_skipped} duplicates)."
+                        )
+                        return True, StageStats(
+                            run_id=run_id,
+                            run_timestamp=run_timestamp,
+                            source_filename=source_filename,
+                            stage_name="upload",
+                            rows_input=rows_input,
+                            rows_output=rows_inserted,
+                            rows_filtered=rows_duplicates_skipped,
+                            rows_duplicates_skipped=rows_duplicates_skipped,
+                            filter_reason="duplicate_row_hash" if rows_duplicates_skipped > 0 else None,
+                            processing_seconds=time.time() - t0,
+                            status="success",
+                        )
+
+            # A retry of the same run and files reuses a temp table left by an attempt
+            # that failed after the load, instead of loading the same files again.
+            # The name only covers run and URIs, so the table is reused only if it is
+            # newer than every blob; a file re-uploaded since is loaded again.
+            existing_temp = None
+            try:
+                existing_temp = bq_client.get_table(temp_table_id)
+            except NotFound:
+                pass
+
+            if (
+                existing_temp is not None
+                and existing_temp.num_rows
+                and _written_after(existing_temp, [uri] if isinstance(uri, str) else uri)
+            ):
+                loaded_rows = existing_temp.num_rows
+                rows_input = loaded_rows
+                source_schema = existing_temp.schema
+                logger.info(f"Reusing temp table {temp_table_id} from a previous attempt ({loaded_rows} rows)")
+            else:
+                # 1. Load to Temp Table
+                job_config = bigquery.LoadJobConfig(
+                    source_format=bigquery.SourceFormat.PARQUET,
+                    write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+                )
 
-        # 1. Load to Temp Table
-        job_config = bigquery.LoadJobConfig(
-            source_format=bigquery.SourceFormat.PARQUET,
-            write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
-        )
+                load_job = bq_client.load_table_from_uri(uri, temp_table_id, job_config=job_config)
+                load_job.result()
+                
+                # Verify rows were actually loaded
+                loaded_rows = load_job.output_rows or 0
+                rows_input = loaded_rows
+                if loaded_rows == 0:
+                    raise RuntimeError(f"BigQuery load completed but 0 rows loaded from {uri_desc}")
+                logger.info(f"Loaded {loaded_rows} rows to temp table {temp_table_id} from {uri_desc}")
 
-        load_job = bq_client.load_table_from_uri(uri, temp_table_id, job_config=job_config)
-        load_job.result()
-        
-        # Verify rows were actually loaded
-        loaded_rows = load_job.output_rows or 0
-        rows_input = loaded_rows
-        if loaded_rows == 0:
-            raise RuntimeError(f"BigQuery load completed but 0 rows loaded from {uri}")
-        logger.info(f"Loaded {loaded_rows} rows to temp table {temp_table_id} from {uri}")
+                # Expire the temp table even if this process dies before cleanup
+                _cleanup_executor.submit(_expire_temp_table, temp_table_id)
+
+                # 2. Discover schema for dynamic SQL
+                # The finished load job already carries the resolved schema; only fetch
+                # the temp table's metadata if the job resource didn't include it.
+                source_schema = load_job.schema
+                if not source_schema:
+                    source_schema = bq_client.get_table(temp_table_id).schema
 
-        # 2. Discover schema for dynamic SQL
-        temp_table = bq_client.get_table(temp_table_id)
-        temp_columns = [field.name for field in temp_table.schema]
+        temp_columns = [field.name for field in source_schema]
 
         if not temp_columns:
-            raise RuntimeError("Temp table has no columns; aborting load.")
+            raise RuntimeError("Source has no columns; aborting load.")
+
+        # Hash in BigQuery only when asked to; otherwise files without ROW_HASH take the
+        # append-only INSERT below
+        if COMPUTE_ROW_HASH and {"METER_ID", "DATA_TIME"} <= set(temp_columns):
+            base_columns = [c for c in temp_columns if c != "ROW_HASH"]
+            base_str = ", ".join(f"`{c}`" for c in base_columns)
+            source_ref = f"(SELECT {base_str}, {ROW_HASH_SQL} AS ROW_HASH FROM {source_ref})"
+            temp_columns = base_columns + ["ROW_HASH"]
+            source_schema = [f for f in source_schema if f.name != "ROW_HASH"]
+            source_schema.append(bigquery.SchemaField("ROW_HASH", "INT64"))
+            logger.info("Computing ROW_HASH in BigQuery")
 
         columns_str = ", ".join(f"`{c}`" for c in temp_columns)
         values_str = ", ".join(f"S.`{c}`" for c in temp_columns)
 
         # 3. Check if target table exists
-        target_exists = False
-        try:
-            bq_client.get_table(target_table_id)
-            target_exists = True
-        except Exception:
-            pass
-
-        if not target_exists:
-            # Create partitioned/clustered table from scratch
-            logger.info(f"Target table {target_table_id} does not exist. Creating with partitioning...")
-            create_partitioned_table(bq_client, target_table_id, temp_table.schema)
-            
-            # Insert all data from temp table
-            insert_query = f"""
-            INSERT `{target_table_id}` ({columns_str})
-            SELECT {values_str}
-            FROM `{temp_table_id}` AS S
-            """
-            query_job = bq_client.query(insert_query)
-            query_job.result()
-            rows_inserted = loaded_rows
-            logger.info(f"Inserted {loaded_rows} rows into new table {target_table_id}.")
-        else:
+        # Serialized across worker threads so only one file creates the table;
+        # the rest see it afterwards and take the dedup path.
+        with _target_table_lock:
+            target_exists = False
+            try:
+                bq_client.get_table(target_table_id)
+                target_exists = True
+            except Exception:
+                pass
+
+            if not target_exists:
+                # Create partitioned/clustered table from scratch
+                logger.info(f"Target table {target_table_id} does not exist. Creating with partitioning...")
+                create_partitioned_table(bq_client, target_table_id, source_schema)
+                
+                # Insert all data from the source
+                insert_query = f"""
+                INSERT `{target_table_id}` ({columns_str})
+                SELECT {values_str}
+                FROM {source_ref} AS S
+                """
+                query_job = bq_client.query(insert_query, job_config=_query_config(table_definitions))
+                query_job.result()
+                rows_inserted = loaded_rows
+                logger.info(f"Inserted {loaded_rows} rows into new table {target_table_id}.")
+
+        if target_exists:
             # Target exists - use INSERT with NOT EXISTS for deduplication (faster than MERGE)
             if "ROW_HASH" in temp_columns:
+                # ROW_HASH is derived from DATA_TIME, so a duplicate can only live in the
+                # partitions covered by the incoming rows. Bounding T.DATA_TIME with
+                # constants lets BigQuery prune the target instead of scanning it all.
+                time_range_sql = ""
+                query_parameters = None
+                time_field = next((f for f in source_schema if f.name == "DATA_TIME"), None)
+                if time_field is not None:
+                    range_job = bq_client.query(
+                        f"SELECT MIN(DATA_TIME) AS lo, MAX(DATA_TIME) AS hi FROM {source_ref}",
+                        job_config=_query_config(table_definitions),
+                    )
+                    range_row = next(iter(range_job.result()))
+                    if range_row.lo is not None and range_row.hi is not None:
+                        time_range_sql = "AND T.DATA_TIME BETWEEN @lo AND @hi"
+                        query_parameters = [
+                            bigquery.ScalarQueryParameter("lo", time_field.field_type, range_row.lo),
+                            bigquery.ScalarQueryParameter("hi", time_field.field_type, range_row.hi),
+                        ]
+                        logger.info(f"Restricting dedup to DATA_TIME between {range_row.lo} and {range_row.hi}")
+
                 # Use INSERT...SELECT with NOT EXISTS - much faster than MERGE for large tables
                 insert_dedup_query = f"""
                 INSERT `{target_table_id}` ({columns_str})
                 SELECT {values_str}
-                FROM `{temp_table_id}` AS S
+                FROM {source_ref} AS S
                 WHERE NOT EXISTS (
                     SELECT 1 FROM `{target_table_id}` T 
                     WHERE T.ROW_HASH = S.ROW_HASH
+                    {time_range_sql}
                 )
                 """
                 logger.info("Running INSERT with deduplication on ROW_HASH...")
-                query_job = bq_client.query(insert_dedup_query)
+                query_job = bq_client.query(
+                    insert_dedup_query,
+                    job_config=_query_config(table_definitions, query_parameters),
+                )
                 query_job.result()
                 
                 # Get rows inserted
@@ -193,23 +593,23 @@ def load_gcs_to_bigquery(
                 logger.info(f"Inserted {rows_inserted} new rows into {target_table_id} (skipped {rows_duplicates_skipped} duplicates).")
             else:
                 logger.warning(
-                    "ROW_HASH column not found in temp table; falling back to append-only INSERT."
+                    "ROW_HASH column not found in source; falling back to append-only INSERT."
                 )
                 insert_query = f"""
                 INSERT `{target_table_id}` ({columns_str})
                 SELECT {values_str}
-                FROM `{temp_table_id}` AS S
+                FROM {source_ref} AS S
                 """
-                query_job = bq_client.query(insert_query)
+                query_job = bq_client.query(insert_query, job_config=_query_config(table_definitions))
                 query_job.result()
                 rows_inserted = loaded_rows
                 logger.info(
-                    f"Appended data from {temp_table_id} into {target_table_id} without dedup."
+                    f"Appended data from {source_ref} into {target_table_id} without dedup."
                 )
 
-        # 4. Cleanup Temp Table
-        bq_client.delete_table(temp_table_id, not_found_ok=True)
-        logger.info(f"Cleaned up temp table {temp_table_id}.")
+        # 4. Cleanup Temp Table (off the critical path; finishes before the process exits)
+        if temp_table_id:
+            _cleanup_executor.submit(_delete_temp_table, temp_table_id)
 
         processing_seconds = time.time() - t0
         
@@ -249,22 +649,69 @@ def load_gcs_to_bigquery(
 
 
 def load_etl_stats() -> list[dict]:
-    """Load ETL stats from JSON file created by etl_processor."""
-    stats_path = os.path.join(LOCAL_OUTPUT_DIR, "_etl_stats.json")
+    """Load ETL stats from the feather file created by etl_processor."""
+    stats_path = os.path.join(LOCAL_OUTPUT_DIR, "_etl_stats.feather")
     if os.path.exists(stats_path):
         try:
-            with open(stats_path, "r") as f:
-                return json.load(f)
+            return feather.read_table(stats_path, memory_map=True).to_pylist()
         except Exception as e:
             logger.warning(f"Failed to load ETL stats: {e}")
     return []
 
 
+def _iter_files(root: str, suffix: str):
+    """Recursively yields file paths under root ending with suffix (os.scandir reuses cached DirEntry types)."""
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(suffix) and entry.is_file():
+                    yield entry.path
+
+
+def _upload_one(local_file: str, existing: dict[str, storage.Blob]) -> Optional[tuple[str, str]]:
+    """Uploads one parquet file to GCS. Returns (gcs_uri, source_filename) or None on failure."""
+    relative_path = os.path.relpath(local_file, LOCAL_OUTPUT_DIR)
+    gcs_path = f"{GCS_PREFIX}{relative_path}"
+    
+    # Get source filename from parquet path (remove quarter folder prefix)
+    source_filename = os.path.basename(local_file).replace(".parquet", ".csv")
+
+    gcs_uri = upload_to_gcs(BUCKET_NAME, local_file, gcs_path, existing)
+    if not gcs_uri:
+        return None
+    return gcs_uri, source_filename
+
+
+def _load_to_bigquery(
+    gcs_uri: str | list[str],
+    source_filename: str,
+    run_id: str,
+    run_timestamp: datetime,
+) -> Optional[StageStats]:
+    """Loads uploaded parquet URI(s) into BigQuery. Returns the upload stats."""
+    success, stats = load_gcs_to_bigquery(
+        gcs_uri, DATASET_ID, TABLE_ID,
+        source_filename=source_filename,
+        run_id=run_id,
+        run_timestamp=run_timestamp,
+    )
+    if not success:
+        logger.error(f"Failed to load {source_filename} to BigQuery")
+        # Continue with other files, but record the failure
+    return stats
+
+
 def main() -> int:
     """
     Main cloud upload orchestration function.
     Uploads parquet files to GCS, loads to BigQuery, and records stats.
     """
+    logger.info(
+        f"Cloud Config: Project={PROJECT_ID}, Bucket={BUCKET_NAME}, ChunkSize={UPLOAD_CHUNK_SIZE_MB}MB"
+    )
     run_id = get_run_id()
     run_timestamp = datetime.now()
     logger.info(f"Starting cloud upload with run_id: {run_id}")
@@ -276,7 +723,7 @@ def main() -> int:
         )
         return 1
 
-    parquet_files = glob.glob(os.path.join(LOCAL_OUTPUT_DIR, "**/*.parquet"), recursive=True)
+    parquet_files = sorted(_iter_files(LOCAL_OUTPUT_DIR, ".parquet"))
 
     if not parquet_files:
         logger.warning(f"No Parquet files found in {LOCAL_OUTPUT_DIR}")
@@ -291,43 +738,73 @@ def main() -> int:
     all_stats: list[StageStats] = []
     
     # Convert ETL stats dicts back to StageStats objects
+    # (feather preserves run_timestamp as a datetime, so no re-parsing is needed)
     for stat_dict in etl_stats_data:
         try:
-            # Parse timestamp back to datetime
-            if isinstance(stat_dict.get("run_timestamp"), str):
-                stat_dict["run_timestamp"] = datetime.fromisoformat(stat_dict["run_timestamp"])
             all_stats.append(StageStats(**stat_dict))
         except Exception as e:
             logger.warning(f"Failed to parse ETL stat: {e}")
 
-    for local_file in parquet_files:
-        relative_path = os.path.relpath(local_file, LOCAL_OUTPUT_DIR)
-        gcs_path = f"{GCS_PREFIX}{relative_path}"
-        
-        # Get source filename from parquet path (remove quarter folder prefix)
-        source_filename = os.path.basename(local_file).replace(".parquet", ".csv")
-
-        gcs_uri = upload_to_gcs(BUCKET_NAME, local_file, gcs_path)
+    # One listing instead of a HEAD request per file (also returns each blob's CRC32C)
+    existing = list_existing_blobs(BUCKET_NAME, GCS_PREFIX)
+    logger.info(f"Found {len(existing)} existing blobs under gs://{BUCKET_NAME}/{GCS_PREFIX}")
 
-        if gcs_uri:
-            success, stats = load_gcs_to_bigquery(
-                gcs_uri, DATASET_ID, TABLE_ID,
-                source_filename=source_filename,
-                run_id=run_id,
-                run_timestamp=run_timestamp,
+    logger.info(
+        f"Processing files with {UPLOAD_CONCURRENCY} upload workers "
+        f"and {CLOUD_LOADER_WORKERS} load workers..."
+    )
+    with ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY) as upload_pool, \
+            ThreadPoolExecutor(max_workers=CLOUD_LOADER_WORKERS) as load_pool:
+        # 1. Upload all files in parallel
+        upload_futures = [
+            upload_pool.submit(_upload_one, local_file, existing)
+            for local_file in parquet_files
+        ]
+        uploaded_count = 0
+        pending_batch: list[str] = []
+        load_futures = []
+        for future in as_completed(upload_futures):
+            result = future.result()
+            if not result:
+                continue
+            uploaded_count += 1
+            uri, source_filename = result
+            if not BATCH_LOAD:
+                # 2b. One load job per file, started as soon as its upload lands so
+                # BigQuery loads overlap the remaining uploads
+                load_futures.append(
+                    load_pool.submit(_load_to_bigquery, uri, source_filename, run_id, run_timestamp)
+                )
+                continue
+
+            pending_batch.append(uri)
+            if BATCH_MAX_FILES and len(pending_batch) >= BATCH_MAX_FILES:
+                # 2a. A full batch starts loading while later uploads are still running
+                logger.info(f"Loading batch of {len(pending_batch)} files into BigQuery...")
+                load_futures.append(
+                    load_pool.submit(_load_to_bigquery, pending_batch, "all_files", run_id, run_timestamp)
+                )
+                pending_batch = []
+
+        if not uploaded_count:
+            logger.warning("No files were uploaded successfully; skipping BigQuery load.")
+        elif pending_batch:
+            # 2a. One load job + one INSERT for the remaining (or all) files
+            logger.info(f"Loading batch of {len(pending_batch)} files into BigQuery...")
+            load_futures.append(
+                load_pool.submit(_load_to_bigquery, pending_batch, "all_files", run_id, run_timestamp)
             )
+
+        for future in as_completed(load_futures):
+            stats = future.result()
             if stats:
                 all_stats.append(stats)
-            
-            if not success:
-                logger.error(f"Failed to load {gcs_uri} to BigQuery")
-                # Continue with other files, but record the failure
     
     # Write all stats to BigQuery
     if all_stats:
         logger.info(f"Writing {len(all_stats)} stats records to BigQuery...")
         try:
-            bq_client = bigquery.Client(project=PROJECT_ID)
+            bq_client = _bq()
             ensure_stats_table_exists(bq_client)
             insert_stats_batch(all_stats, bq_client)
         except Exception as e:
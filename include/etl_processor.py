@@ -1,14 +1,24 @@
 import os
 import sys
-import glob
+import functools
+import hashlib
 import json
 import logging
+import multiprocessing
+import re
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import asdict
 from datetime import datetime
 from typing import Optional
 
 import polars as pl
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
 import google.generativeai as genai
+from rapidfuzz import fuzz, process
 
 from pipeline_stats import StageStats, insert_stats, get_run_id
 
@@ -17,20 +27,46 @@ from pipeline_stats import StageStats, insert_stats, get_run_id
 # CONFIGURATION
 # =========================
 
-# API key for Gemini (LLM)
+# API key for Gemini (LLM); applied on the first LLM call, not at import
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "YOUR_API_KEY_HERE")
-genai.configure(api_key=GOOGLE_API_KEY)
 
 AIRFLOW_HOME = os.getenv("AIRFLOW_HOME", "/usr/local/airflow")
 INPUT_DIR = os.path.join(AIRFLOW_HOME, "include/raw_data")
 OUTPUT_DIR = os.path.join(AIRFLOW_HOME, "include/processed_data")
 
 # Tunables from environment
-ROW_GROUP_SIZE = int(os.getenv("ETL_ROW_GROUP_SIZE", "50000"))
-LOW_MEMORY_MODE = os.getenv("ETL_LOW_MEMORY_MODE", "true").lower() == "true"
-PARQUET_COMPRESSION = os.getenv("PARQUET_COMPRESSION", "snappy")
+ROW_GROUP_SIZE = int(os.getenv("ETL_ROW_GROUP_SIZE", "500000"))
+# "true", "false", or "auto" (low-memory only when free RAM is tight for the input)
+LOW_MEMORY_MODE = os.getenv("ETL_LOW_MEMORY_MODE", "auto").lower()
+# In auto mode, Polars' low_memory is turned off once MemAvailable is this many times the input size
+LOW_MEMORY_HEADROOM_FACTOR = 4
+PARQUET_COMPRESSION = os.getenv("PARQUET_COMPRESSION", "zstd")
+PARQUET_COMPRESSION_LEVEL = int(os.getenv("PARQUET_COMPRESSION_LEVEL", "3"))
+# Parquet data page size (bytes)
+PARQUET_DATA_PAGE_SIZE = 1024 * 1024
 ENABLE_ROW_HASH = os.getenv("ETL_ENABLE_ROW_HASH", "true").lower() == "true"
-INFER_SCHEMA_LENGTH = int(os.getenv("ETL_INFER_SCHEMA_LENGTH", "1000"))
+# ROW_HASH formula: "legacy" (concat_str hash, matches rows already loaded) or "struct"
+# (struct hash, no string intermediate; needs the loaded ROW_HASH values rebuilt first)
+ROW_HASH_ALGORITHM = os.getenv("ETL_ROW_HASH_ALGORITHM", "legacy").lower()
+# On-disk cache of LLM schema decisions, keyed by header hash
+SCHEMA_CACHE_PATH = os.getenv(
+    "ETL_SCHEMA_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "etl_processor", "schema_cache.json"),
+)
+# Cached LLM decisions older than this are asked again
+SCHEMA_CACHE_TTL_SECONDS = 7 * 24 * 3600
+# Part of the cache key; bump when the Gemini prompts change to drop stale decisions
+PROMPT_VERSION = "v1"
+# Distinct header layouts whose schema mapping (possibly an LLM call) is resolved at once
+SCHEMA_RESOLVE_WORKERS = 4
+# Files processed in parallel worker processes (0 = half the CPU count)
+ETL_MAX_WORKERS = int(os.getenv("ETL_MAX_WORKERS", "0"))
+# Combine CSVs with the same layout and quarter into one scan/Parquet file
+COMBINE_FILES = os.getenv("ETL_COMBINE_FILES", "false").lower() == "true"
+# Bytes read at a time when looking for the header line
+HEADER_READ_SIZE = 4096
+# Block size used when counting input rows (bytes)
+COUNT_ROWS_BLOCK_SIZE = 8 * 1024 * 1024
 
 # The schema we EXPECT to see based on actual data inspection
 EXPECTED_HEADERS = [
@@ -51,6 +87,21 @@ EXPECTED_HEADERS = [
     "STATUS",
 ]
 
+# Numeric columns and the types they are written with: METER_ID (hashed into
+# ROW_HASH) and the power columns downstream models use. These are the types the
+# smart_meters_clean table has for them; every other column is read as Utf8.
+NUMERIC_COLUMN_TYPES = {
+    "METER_ID": pl.Int64,
+    "IMPORT_ACTIVE_POWER": pl.Float64,
+    "EXPORT_ACTIVE_POWER": pl.Float64,
+    "IMPORT_REACTIVE_POWER": pl.Float64,
+    "EXPORT_REACTIVE_POWER": pl.Float64,
+}
+
+# Suffix of the temporary typed copies made when numeric columns are cast from
+# strings; they sit next to the raw values so rejected values can be counted
+_TYPED_SUFFIX = "__TYPED"
+
 # Critical columns that must be present for the pipeline to work
 IMPORTANT_COLUMNS = [
     "METER_ID",
@@ -58,6 +109,24 @@ IMPORTANT_COLUMNS = [
     "IMPORT_ACTIVE_POWER",
 ]
 
+# Known column name variations for important columns, in order of preference
+COLUMN_VARIATIONS = {
+    "METER_ID": ["METER_ID", "METERID", "METER", "MTR_ID", "ID_METER"],
+    "DATA_TIME": ["DATA_TIME", "DATATIME", "DATETIME", "DATE_TIME", "READING_DATETIME",
+                  "READ_TIME", "TIMESTAMP", "TIME", "DT", "READING_TIME", "READ_DATETIME"],
+    "IMPORT_ACTIVE_POWER": ["IMPORT_ACTIVE_POWER", "IMPORTACTIVEPOWER", "ACTIVE_IMPORT_POWER",
+                            "ACTIVE_IMP_POWER", "IMP_ACTIVE_POWER", "IMPORT_POWER",
+                            "ACTIVE_POWER", "KW_IMPORT", "KW_IMP", "POWER_IMPORT"],
+}
+# Minimum similarity (0-100, on normalized names) for a fuzzy header match
+FUZZY_MATCH_CUTOFF = 85
+# Reverse lookup: upper-cased variation -> (important column, preference rank)
+VARIATION_TO_TARGET = {
+    variation.upper(): (target, rank)
+    for target, variations in COLUMN_VARIATIONS.items()
+    for rank, variation in enumerate(variations)
+}
+
 
 # =========================
 # LOGGING SETUP
@@ -65,15 +134,13 @@ IMPORTANT_COLUMNS = [
 
 logger = logging.getLogger("etl_processor")
 logger.setLevel(logging.INFO)
-
-handler = logging.StreamHandler(sys.stdout)
-formatter = logging.Formatter(
-    '{"timestamp": "%(asctime)s", "level": "%(levelname)s", "message": "%(message)s"}',
-    datefmt='%Y-%m-%dT%H:%M:%S%z',
-)
-handler.setFormatter(formatter)
-
 if not logger.handlers:
+    handler = logging.StreamHandler(sys.stdout)
+    formatter = logging.Formatter(
+        '{"timestamp": "%(asctime)s", "level": "%(levelname)s", "message": "%(message)s"}',
+        datefmt='%Y-%m-%dT%H:%M:%S%z',
+    )
+    handler.setFormatter(formatter)
     logger.addHandler(handler)
 
 
@@ -81,34 +148,84 @@ if not logger.handlers:
 # HELPER FUNCTIONS
 # =========================
 
+# Characters ignored when comparing header names (case is folded separately)
+_HEADER_NOISE_RE = re.compile(r"[^A-Z0-9]")
+
+# Set once genai.configure has run in this process
+_genai_configured = False
+
+# First-row DATA_TIME layouts that get a single-format parse
+_DATETIME_VALUE_RE = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(\.\d+)?$")
+_DATE_VALUE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+# In-memory view of SCHEMA_CACHE_PATH (loaded lazily)
+_schema_cache: dict | None = None
+# Serializes cache loads and writes from the threads in plan_files
+_schema_cache_lock = threading.Lock()
+
+
+def _read_head_bytes(filepath: str, n_lines: int = 1) -> list[bytes]:
+    """
+    Returns the first n_lines lines of a file as raw bytes, with any UTF-8 BOM removed.
+    Reads with os.read in small blocks instead of going through a buffered text stream.
+    """
+    fd = os.open(filepath, os.O_RDONLY)
+    try:
+        raw = os.read(fd, HEADER_READ_SIZE)
+        while raw.count(b"\n") < n_lines:
+            chunk = os.read(fd, HEADER_READ_SIZE)
+            if not chunk:
+                break
+            raw += chunk
+    finally:
+        os.close(fd)
+
+    if raw.startswith(b"\xef\xbb\xbf"):
+        raw = raw[3:]
+    return raw.split(b"\n", n_lines)[:n_lines]
+
+
+def _read_head_lines(filepath: str, n_lines: int = 1) -> list[str]:
+    """
+    Returns the first n_lines lines of a file, decoded as UTF-8 (only that slice is decoded).
+    Only line endings are stripped, so padding on the first and last field is kept.
+    """
+    return [line.decode("utf-8").rstrip("\r\n") for line in _read_head_bytes(filepath, n_lines)]
+
+
+def detect_separator_from_line(header_line: bytes) -> str:
+    """
+    Detects the separator used in a raw CSV header line.
+    Returns the detected separator (comma, semicolon, tab, or pipe).
+    """
+    # Count occurrences of common separators (bytes.count runs in C; nothing is decoded)
+    separators = {
+        ",": header_line.count(b","),
+        ";": header_line.count(b";"),
+        "\t": header_line.count(b"\t"),
+        "|": header_line.count(b"|"),
+    }
+
+    # Find the separator with most occurrences
+    detected = max(separators, key=separators.get)
+
+    # Only use detected separator if it appears at least once
+    if separators[detected] > 0:
+        logger.info(f"Detected CSV separator: '{detected}' (count: {separators[detected]})")
+        return detected
+
+    # Default to comma if no separator found
+    logger.info("No separator detected, defaulting to comma")
+    return ","
+
+
 def detect_csv_separator(filepath: str) -> str:
     """
     Detects the separator used in a CSV file by analyzing the first line.
     Returns the detected separator (comma, semicolon, tab, or pipe).
     """
     try:
-        with open(filepath, "r", encoding="utf-8-sig") as f:
-            header_line = f.readline().strip()
-        
-        # Count occurrences of common separators
-        separators = {
-            ",": header_line.count(","),
-            ";": header_line.count(";"),
-            "\t": header_line.count("\t"),
-            "|": header_line.count("|"),
-        }
-        
-        # Find the separator with most occurrences
-        detected = max(separators, key=separators.get)
-        
-        # Only use detected separator if it appears at least once
-        if separators[detected] > 0:
-            logger.info(f"Detected CSV separator: '{detected}' (count: {separators[detected]})")
-            return detected
-        
-        # Default to comma if no separator found
-        logger.info("No separator detected, defaulting to comma")
-        return ","
+        return detect_separator_from_line(_read_head_bytes(filepath)[0])
     except Exception as e:
         logger.warning(f"Failed to detect separator: {e}. Defaulting to comma.")
         return ","
@@ -117,17 +234,18 @@ def detect_csv_separator(filepath: str) -> str:
 def get_csv_headers(filepath: str, separator: str | None = None) -> tuple[list[str], str]:
     """
     Reads only the first line of the CSV efficiently to get headers.
-    Auto-detects separator if not provided.
+    Auto-detects separator if not provided; the same read serves both.
     Returns tuple of (headers, separator).
     """
     logger.info(f"Reading headers from {filepath}")
     try:
+        raw_line = _read_head_bytes(filepath)[0]
+
         # Auto-detect separator if not provided
         if separator is None:
-            separator = detect_csv_separator(filepath)
-        
-        with open(filepath, "r", encoding="utf-8-sig") as f:  # Handle BOM
-            header_line = f.readline().strip()
+            separator = detect_separator_from_line(raw_line)
+
+        header_line = raw_line.decode("utf-8").strip()
         headers = [h.replace('"', "").strip() for h in header_line.split(separator) if h.strip()]
         logger.info(f"Completed Reading Headers: {headers}")
         return headers, separator
@@ -136,11 +254,97 @@ def get_csv_headers(filepath: str, separator: str | None = None) -> tuple[list[s
         return [], ","
 
 
+def _schema_cache_key(kind: str, current_headers: list[str], target_headers: list[str]) -> str:
+    """
+    Hash used as the schema cache key: which LLM call (kind), both header sets
+    (order-insensitive) and PROMPT_VERSION.
+    """
+    payload = json.dumps(
+        {
+            "kind": kind,
+            "headers": sorted(current_headers),
+            "expected": sorted(target_headers),
+            "prompt_version": PROMPT_VERSION,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _cache_entry_fresh(entry) -> bool:
+    return (
+        isinstance(entry, dict)
+        and "stored_at" in entry
+        and time.time() - entry["stored_at"] < SCHEMA_CACHE_TTL_SECONDS
+    )
+
+
+def _read_schema_cache() -> dict:
+    try:
+        with open(SCHEMA_CACHE_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def get_cached_schema_decision(key: str) -> dict | None:
+    """
+    Returns a cached LLM schema decision, loading the on-disk cache on first use.
+    Entries older than SCHEMA_CACHE_TTL_SECONDS count as a miss.
+    """
+    global _schema_cache
+    with _schema_cache_lock:
+        if _schema_cache is None:
+            _schema_cache = _read_schema_cache()
+        entry = _schema_cache.get(key)
+    return entry["decision"] if _cache_entry_fresh(entry) else None
+
+
+def store_schema_decision(key: str, decision: dict) -> None:
+    """
+    Saves an LLM schema decision in memory and on disk. The file is re-read and
+    merged before an atomic replace, since worker processes may write concurrently;
+    expired entries are dropped on the way.
+    """
+    global _schema_cache
+    with _schema_cache_lock:
+        if _schema_cache is None:
+            _schema_cache = _read_schema_cache()
+        entry = {"stored_at": time.time(), "decision": decision}
+        _schema_cache[key] = entry
+        try:
+            os.makedirs(os.path.dirname(SCHEMA_CACHE_PATH), exist_ok=True)
+            merged = {k: v for k, v in _read_schema_cache().items() if _cache_entry_fresh(v)}
+            merged[key] = entry
+            tmp_path = f"{SCHEMA_CACHE_PATH}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(merged, f)
+            os.replace(tmp_path, SCHEMA_CACHE_PATH)
+        except OSError as e:
+            logger.warning(f"Failed to persist schema cache: {e}")
+
+
+def _ensure_genai_configured() -> None:
+    """Configures the Gemini client on first use, so importing this module has no side effects."""
+    global _genai_configured
+    if not _genai_configured:
+        genai.configure(api_key=GOOGLE_API_KEY)
+        _genai_configured = True
+
+
 def validate_schema_with_gemini(current_headers: list[str], expected_headers: list[str]) -> dict:
     """
     Asks Gemini to map current headers to expected headers.
+    Decisions are cached by a hash of both header lists, so each header shape
+    is sent to the LLM only once.
     Returns a dict with keys: status, mapping, reason.
     """
+    cache_key = _schema_cache_key("validate", current_headers, expected_headers)
+    cached = get_cached_schema_decision(cache_key)
+    if cached is not None:
+        logger.info("Using cached LLM schema validation for these headers")
+        return cached
+
     logger.info("Asking Gemini to validate headers with LLM...")
 
     prompt = f"""
@@ -163,6 +367,7 @@ def validate_schema_with_gemini(current_headers: list[str], expected_headers: li
     }}
     """
 
+    _ensure_genai_configured()
     models_to_try = ["gemini-2.5-flash"]
 
     for model_name in models_to_try:
@@ -174,6 +379,7 @@ def validate_schema_with_gemini(current_headers: list[str], expected_headers: li
             )
             result = json.loads(cleaned_text)
             logger.info("Completed LLM Validation")
+            store_schema_decision(cache_key, result)
             return result
         except Exception as e:
             if "404" in str(e) and "models/" in str(e):
@@ -196,8 +402,15 @@ def validate_schema_with_gemini(current_headers: list[str], expected_headers: li
 def map_important_columns_with_gemini(current_headers: list[str], important_columns: list[str]) -> dict:
     """
     Asks Gemini to map current headers to important columns only using structured output.
+    Results are cached like validate_schema_with_gemini's.
     Returns a dict with keys: status, mapping, reason.
     """
+    cache_key = _schema_cache_key("important", current_headers, important_columns)
+    cached = get_cached_schema_decision(cache_key)
+    if cached is not None:
+        logger.info("Using cached LLM important-column mapping for these headers")
+        return cached
+
     logger.info("Asking Gemini to map important columns with LLM (structured output)...")
 
     prompt = f"""
@@ -247,6 +460,7 @@ def map_important_columns_with_gemini(current_headers: list[str], important_colu
         "required": ["status", "column_mappings", "reason"]
     }
 
+    _ensure_genai_configured()
     models_to_try = ["gemini-2.0-flash"]
 
     for model_name in models_to_try:
@@ -271,11 +485,13 @@ def map_important_columns_with_gemini(current_headers: list[str], important_colu
                 if incoming and target:
                     mapping[incoming] = target
             
-            return {
+            decision = {
                 "status": result.get("status", "FAILED"),
                 "mapping": mapping,
                 "reason": result.get("reason", "No reason provided"),
             }
+            store_schema_decision(cache_key, decision)
+            return decision
         except Exception as e:
             if "404" in str(e) and "models/" in str(e):
                 logger.warning(
@@ -294,6 +510,19 @@ def map_important_columns_with_gemini(current_headers: list[str], important_colu
     }
 
 
+@functools.lru_cache(maxsize=128)
+def _header_lookups(headers: tuple[str, ...]) -> tuple[frozenset, dict, dict]:
+    """
+    Lookups over one header row, built once per distinct row and shared by the
+    mapping helpers: (exact names, upper-cased -> header, normalized -> header).
+    """
+    return (
+        frozenset(headers),
+        {h.strip().upper(): h for h in headers},
+        {normalize_header(h): h for h in headers},
+    )
+
+
 def validate_and_fix_mapping(mapping: dict, actual_headers: list[str]) -> dict:
     """
     Validates LLM-returned column names against actual CSV headers.
@@ -303,65 +532,144 @@ def validate_and_fix_mapping(mapping: dict, actual_headers: list[str]) -> dict:
     if not mapping:
         return {}
     
-    # Build case-insensitive lookup: normalized_name -> actual_name
-    header_lookup = {h.strip().upper(): h for h in actual_headers}
+    # Exact names, case-insensitive lookup and normalized lookup (cached per header row)
+    exact_headers, header_lookup, normalized_lookup = _header_lookups(tuple(actual_headers))
     
     validated_mapping = {}
+    unresolved = []
     for incoming_col, target_col in mapping.items():
         normalized_incoming = incoming_col.strip().upper()
         
-        if incoming_col in actual_headers:
+        if incoming_col in exact_headers:
             # Exact match - use as is
-            validated_mapping[incoming_col] = target_col
+            actual_col = incoming_col
         elif normalized_incoming in header_lookup:
             # Case-insensitive match - use actual column name from CSV
             actual_col = header_lookup[normalized_incoming]
             logger.info(f"Fixed column name case: '{incoming_col}' -> '{actual_col}'")
-            validated_mapping[actual_col] = target_col
         else:
-            # Column not found in CSV - skip it
-            logger.warning(f"LLM returned column '{incoming_col}' but it doesn't exist in CSV. Skipping.")
+            unresolved.append((incoming_col, target_col))
+            continue
+        if actual_col in validated_mapping:
+            logger.warning(f"LLM mapped column '{actual_col}' twice. Keeping the first mapping.")
+            continue
+        validated_mapping[actual_col] = target_col
+
+    # Small typo drift in the LLM's copy of the name - use the closest CSV header not
+    # already mapped, with the same guard as the deterministic fuzzy step (a header
+    # closer to a different expected column is never taken)
+    for incoming_col, target_col in unresolved:
+        actual_col = fuzzy_header_match(
+            target_col, actual_headers, set(validated_mapping), query=incoming_col
+        )
+        if actual_col is not None:
+            logger.info(f"Fixed column name: '{incoming_col}' -> '{actual_col}'")
+            validated_mapping[actual_col] = target_col
+            continue
+        # Column not found in CSV - skip it
+        logger.warning(f"LLM returned column '{incoming_col}' but it doesn't exist in CSV. Skipping.")
     
     return validated_mapping
 
 
+def normalize_header(header: str) -> str:
+    """Uppercases a header and drops everything but letters and digits ('Meter Id' -> 'METERID')."""
+    return _HEADER_NOISE_RE.sub("", header.strip().upper())
+
+
+def try_normalized_full_mapping(current_headers: list[str], expected_headers: list[str]) -> dict | None:
+    """
+    Maps the full schema without LLM when headers differ from the expected ones only
+    in case, whitespace or punctuation (e.g. 'Meter Id' vs 'METER_ID').
+    Returns mapping dict if every header maps to a distinct expected column and none
+    is missing, None otherwise.
+    """
+    expected_lookup = {normalize_header(h): h for h in expected_headers}
+
+    mapping = {}
+    for header in current_headers:
+        canonical = expected_lookup.get(normalize_header(header))
+        if canonical is None:
+            return None
+        # Only add to mapping if name differs from target
+        if header != canonical:
+            mapping[header] = canonical
+
+    final_headers = {mapping.get(h, h) for h in current_headers}
+    if len(final_headers) != len(current_headers) or final_headers != set(expected_headers):
+        return None
+
+    logger.info(f"Normalized header mapping succeeded: {json.dumps(mapping)}")
+    return mapping
+
+
+def fuzzy_header_match(
+    target: str, current_headers: list[str], taken: set[str], query: str | None = None
+) -> str | None:
+    """
+    Finds the header most similar to query (default: target itself; normalized
+    Levenshtein ratio, RapidFuzz) among headers not already mapped, for typos like
+    'IMPRT_ACTIVE_PWR'. The match is rejected if that header is closer to an expected
+    column other than target, so e.g. EXPORT_ACTIVE_POWER is never taken for
+    IMPORT_ACTIVE_POWER.
+    Returns the header, or None.
+    """
+    normalized_lookup = _header_lookups(tuple(current_headers))[2]
+    candidates = {n: h for n, h in normalized_lookup.items() if h not in taken}
+    if not candidates:
+        return None
+    target_norm = normalize_header(target)
+    query_norm = normalize_header(query) if query is not None else target_norm
+    match = process.extractOne(
+        query_norm, list(candidates), scorer=fuzz.ratio, score_cutoff=FUZZY_MATCH_CUTOFF
+    )
+    if match is None:
+        return None
+    closest = process.extractOne(
+        match[0], [normalize_header(h) for h in EXPECTED_HEADERS], scorer=fuzz.ratio
+    )
+    if closest is not None and closest[0] != target_norm:
+        return None
+    logger.info(f"Fuzzy matched '{candidates[match[0]]}' -> '{target}' (score {match[1]:.0f})")
+    return candidates[match[0]]
+
+
 def try_deterministic_important_mapping(current_headers: list[str], important_columns: list[str]) -> dict | None:
     """
     Attempts to map important columns using known variations without LLM.
+    One pass over the headers against the precomputed VARIATION_TO_TARGET lookup;
+    when several headers match one column, the earlier-listed variation wins.
     Returns mapping dict if all important columns can be matched, None otherwise.
     """
-    # Known column name variations for important columns
-    column_variations = {
-        "METER_ID": ["METER_ID", "METERID", "METER", "MTR_ID", "ID_METER"],
-        "DATA_TIME": ["DATA_TIME", "DATATIME", "DATETIME", "DATE_TIME", "READING_DATETIME", 
-                      "READ_TIME", "TIMESTAMP", "TIME", "DT", "READING_TIME", "READ_DATETIME"],
-        "IMPORT_ACTIVE_POWER": ["IMPORT_ACTIVE_POWER", "IMPORTACTIVEPOWER", "ACTIVE_IMPORT_POWER",
-                                "ACTIVE_IMP_POWER", "IMP_ACTIVE_POWER", "IMPORT_POWER", 
-                                "ACTIVE_POWER", "KW_IMPORT", "KW_IMP", "POWER_IMPORT"],
-    }
-    
-    # Build case-insensitive lookup: normalized_name -> actual_name
-    header_lookup = {h.strip().upper(): h for h in current_headers}
-    
+    # important column -> (variation rank, actual header)
+    best: dict[str, tuple[int, str]] = {}
+    for header in current_headers:
+        match = VARIATION_TO_TARGET.get(header.strip().upper())
+        if match is None:
+            continue
+        target, rank = match
+        if target not in best or rank < best[target][0]:
+            best[target] = (rank, header)
+
+    # Columns without a known variation get a fuzzy match before giving up
+    taken = {header for _, header in best.values()}
+    for important_col in important_columns:
+        if important_col not in best:
+            header = fuzzy_header_match(important_col, current_headers, taken)
+            if header is not None:
+                best[important_col] = (len(COLUMN_VARIATIONS.get(important_col, [])), header)
+                taken.add(header)
+
     mapping = {}
     for important_col in important_columns:
-        variations = column_variations.get(important_col, [important_col])
-        matched = False
-        
-        for variation in variations:
-            normalized_variation = variation.strip().upper()
-            if normalized_variation in header_lookup:
-                actual_header = header_lookup[normalized_variation]
-                # Only add to mapping if name differs from target
-                if actual_header != important_col:
-                    mapping[actual_header] = important_col
-                matched = True
-                break
-        
-        if not matched:
+        if important_col not in best:
             logger.info(f"Deterministic mapping: Could not find match for '{important_col}'")
             return None  # Could not match this important column
-    
+        actual_header = best[important_col][1]
+        # Only add to mapping if name differs from target
+        if actual_header != important_col:
+            mapping[actual_header] = important_col
+
     logger.info(f"Deterministic mapping succeeded: {json.dumps(mapping)}")
     return mapping
 
@@ -388,6 +696,34 @@ def determine_schema_mapping(current_headers: list[str], expected_headers: list[
         logger.info("Completed Determining Schema Mapping")
         return {"mapping": {}, "reason": reason, "important_only": False}
 
+    # Near match: same columns once case, whitespace and punctuation are ignored
+    normalized_mapping = try_normalized_full_mapping(current_headers, expected_headers)
+    if normalized_mapping is not None:
+        logger.info("Headers match expected schema after normalization; skipping LLM validation.")
+        logger.info("Completed Determining Schema Mapping")
+        return {
+            "mapping": normalized_mapping,
+            "reason": "Header match ignoring case, whitespace and punctuation",
+            "important_only": False,
+        }
+
+    # Important columns present verbatim (ignoring case): nothing to look up
+    if set(IMPORTANT_COLUMNS).issubset(normalized_current):
+        # Columns already named exactly win over case variants of the same name
+        taken = {h for h in current_headers if h in IMPORTANT_COLUMNS}
+        mapping = {}
+        for header, normalized in zip(current_headers, normalized_current):
+            if normalized in IMPORTANT_COLUMNS and normalized not in taken:
+                mapping[header] = normalized
+                taken.add(normalized)
+        logger.info("Important columns present verbatim; skipping variation lookup and LLM.")
+        logger.info("Completed Determining Schema Mapping")
+        return {
+            "mapping": mapping,
+            "reason": "Important columns present verbatim",
+            "important_only": True,
+        }
+
     # Try deterministic mapping first (no LLM needed)
     logger.info("Attempting deterministic mapping of important columns...")
     deterministic_mapping = try_deterministic_important_mapping(current_headers, IMPORTANT_COLUMNS)
@@ -471,10 +807,56 @@ def determine_schema_mapping(current_headers: list[str], expected_headers: list[
     return {"mapping": mapping, "reason": reason, "important_only": False}
 
 
+def _read_first_row(input_path: str, separator: str) -> tuple[list[str], list[str]]:
+    """
+    Returns (headers, first data row) split by hand on the separator, quotes kept on
+    the values. Raises ValueError if there is no data row or it doesn't split into
+    as many fields as the header (e.g. a quoted field contains the separator).
+    """
+    lines = _read_head_lines(input_path, 2)
+    if len(lines) < 2:
+        raise ValueError("file has no data rows")
+    headers = [h.replace('"', "").strip() for h in lines[0].split(separator)]
+    row = lines[1].split(separator)
+    if len(row) != len(headers):
+        raise ValueError("first data row does not split cleanly")
+    return headers, row
+
+
+def _source_column(col_mapping: dict | None, target: str) -> str:
+    """Name in the file of the column that the mapping renames to target."""
+    for orig_col, mapped_col in (col_mapping or {}).items():
+        if mapped_col == target:
+            return orig_col
+    return target
+
+
+def detect_data_time_format(input_path: str, separator: str, col_mapping: dict | None) -> str | None:
+    """
+    Probes the first data row for the zero-padded DATA_TIME layout and returns its
+    strptime format: '%Y-%m-%d %H:%M:%S' for date-times (with or without fractional
+    seconds) or '%Y-%m-%d' for dates. Returns None if it can't tell.
+    """
+    try:
+        headers, row = _read_first_row(input_path, separator)
+        source = _source_column(col_mapping, "DATA_TIME")
+        if source not in headers:
+            return None
+        value = row[headers.index(source)].replace('"', "").strip()
+        if _DATETIME_VALUE_RE.match(value):
+            return "%Y-%m-%d %H:%M:%S"
+        if _DATE_VALUE_RE.match(value):
+            return "%Y-%m-%d"
+    except Exception as e:
+        logger.warning(f"Could not detect DATA_TIME format: {e}")
+    return None
+
+
 def get_file_quarter(input_path: str, col_mapping: dict = None, separator: str = ",") -> str:
     """
-    Reads a small sample of the file to determine the quarter for file organization.
+    Reads the header and first data row to determine the quarter for file organization.
     Returns string like '2023-Q4', or 'UNKNOWN_QUARTER' if not determinable.
+    Only the first few KiB are read and split by hand; no CSV reader is started.
     
     Args:
         input_path: Path to CSV file
@@ -483,36 +865,16 @@ def get_file_quarter(input_path: str, col_mapping: dict = None, separator: str =
     """
     logger.info("Determining file quarter...")
     try:
-        df = pl.read_csv(
-            input_path,
-            separator=separator,
-            quote_char='"',
-            n_rows=1,
-            ignore_errors=True,
-        )
+        # A row that doesn't split cleanly raises; leave it to the per-row fallback
+        headers, row = _read_first_row(input_path, separator)
 
         # Find the column name that maps to DATA_TIME (or use DATA_TIME directly if no mapping)
-        data_time_col = None
-        if col_mapping:
-            # Reverse lookup: find original column that maps to DATA_TIME
-            for orig_col, mapped_col in col_mapping.items():
-                if mapped_col == "DATA_TIME":
-                    data_time_col = orig_col
-                    break
-        
-        # If no mapping found or no mapping provided, check for DATA_TIME directly
-        if not data_time_col:
-            data_time_col = "DATA_TIME" if "DATA_TIME" in df.columns else None
-        
-        # If still not found, check if any column maps to DATA_TIME after applying mapping
-        if not data_time_col and col_mapping:
-            for col in df.columns:
-                if col_mapping.get(col) == "DATA_TIME":
-                    data_time_col = col
-                    break
+        data_time_col = _source_column(col_mapping, "DATA_TIME")
 
-        if data_time_col and data_time_col in df.columns:
-            date_val = datetime.strptime(df[data_time_col][0], "%Y-%m-%d %H:%M:%S")
+        if data_time_col in headers:
+            value = row[headers.index(data_time_col)].replace('"', "").strip()
+            # First 19 chars: ignores fractional seconds ("2025-08-02 00:30:00.4600000")
+            date_val = datetime.strptime(value[:19], "%Y-%m-%d %H:%M:%S")
             quarter = (date_val.month - 1) // 3 + 1
             logger.info("Completed Determining File Quarter")
             return f"{date_val.year}-Q{quarter}"
@@ -523,172 +885,401 @@ def get_file_quarter(input_path: str, col_mapping: dict = None, separator: str =
     return "UNKNOWN_QUARTER"
 
 
+def numeric_scan_overrides(
+    input_paths: list[str], separator: str, col_mapping: dict, column_types: dict
+) -> dict:
+    """
+    Probes the first data row of every file scanned together and returns scan_csv
+    schema_overrides that read the numeric columns straight into their types (keyed
+    by their names in the file). Columns the files don't have are skipped.
+    Returns {} - keep the string strip + cast path - if any file's first value is
+    padded with whitespace, which the CSV number parsers reject.
+    """
+    try:
+        overrides = {}
+        for input_path in input_paths:
+            headers, row = _read_first_row(input_path, separator)
+            for col, dtype in column_types.items():
+                source = _source_column(col_mapping, col)
+                if source not in headers:
+                    continue
+                value = row[headers.index(source)].replace('"', "")
+                if value != value.strip():
+                    return {}
+                overrides[source] = dtype
+        return overrides
+    except Exception as e:
+        logger.warning(f"Could not probe numeric columns: {e}")
+        return {}
+
+
+def available_memory_bytes() -> int | None:
+    """MemAvailable from /proc/meminfo, or None where it can't be read (non-Linux)."""
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def use_low_memory(input_bytes: int, concurrent_jobs: int = 1) -> bool:
+    """
+    Resolves ETL_LOW_MEMORY_MODE for one job. In auto mode, low-memory scanning is
+    used unless this job's share of MemAvailable (split evenly between the jobs
+    running at once) is at least LOW_MEMORY_HEADROOM_FACTOR x input_bytes;
+    if available memory can't be read, it stays on (the safe choice).
+    """
+    if LOW_MEMORY_MODE != "auto":
+        return LOW_MEMORY_MODE == "true"
+    available = available_memory_bytes()
+    if available is None:
+        return True
+    return available // max(1, concurrent_jobs) < LOW_MEMORY_HEADROOM_FACTOR * input_bytes
+
+
 def build_lazy_pipeline(
-    input_path: str,
+    input_path: str | list[str],
     col_mapping: dict,
     quarter_str: str | None,
     important_only: bool = False,
     separator: str = ",",
-) -> pl.LazyFrame:
+    low_memory: bool = True,
+    numeric_in_scan: bool = True,
+) -> tuple[pl.LazyFrame, pl.LazyFrame | None]:
     """
     Build the Polars lazy pipeline: scan CSV, apply mapping, parse dates,
     add derived columns, cast numeric types, optional row hash.
+
+    Returns (q, nulled_q). When numeric columns are cast from strings, nulled_q
+    is a one-row frame counting, per column, the non-empty values the cast
+    turned into null; it branches off q's plan, so collecting both together
+    (pl.collect_all) scans the CSV once. It is None when the CSV reader parsed
+    the numeric columns itself: then an unparseable value raises ComputeError
+    instead of becoming null, and the caller rebuilds with numeric_in_scan=False.
     
     Args:
-        input_path: Path to input CSV file
+        input_path: Path to input CSV file, or a list of CSVs sharing one layout
         col_mapping: Dictionary mapping original column names to expected names
         quarter_str: Quarter string for file organization
         important_only: If True, select only important columns after mapping
         separator: CSV separator character
+        low_memory: Passed to scan_csv; trades throughput for lower peak memory
+        numeric_in_scan: If False, always read numeric columns as strings and cast
     """
+    # Only the important columns survive important_only mode
+    numeric_types = {
+        col: dtype for col, dtype in NUMERIC_COLUMN_TYPES.items()
+        if not important_only or col in IMPORTANT_COLUMNS
+    }
+
+    # Numeric columns are parsed into their NUMERIC_COLUMN_TYPES by the CSV reader
+    # itself when the first row of every file shows clean numbers. The reader then
+    # runs strict (no ignore_errors), so a bad value further down raises instead of
+    # silently becoming null.
+    input_paths = [input_path] if isinstance(input_path, str) else list(input_path)
+    probe_path = input_paths[0]
+    numeric_overrides = (
+        numeric_scan_overrides(input_paths, separator, col_mapping, numeric_types)
+        if numeric_in_scan
+        else {}
+    )
+
     # 1. Lazy Scan (no data loaded yet)
+    # Every other column is read as Utf8 (infer_schema_length=0), so no rows are
+    # sampled for type inference; DATA_TIME is parsed below. Numeric columns get
+    # the same pinned types in every file instead of whatever a sample suggested.
     t_scan_start = time.perf_counter()
     q = pl.scan_csv(
         input_path,
         separator=separator,
         quote_char='"',
-        infer_schema_length=INFER_SCHEMA_LENGTH,
-        ignore_errors=True,
-        low_memory=LOW_MEMORY_MODE,
+        infer_schema_length=0,
+        schema_overrides=numeric_overrides or None,
+        ignore_errors=not numeric_overrides,
+        low_memory=low_memory,
         rechunk=False,
     )
     t_scan_end = time.perf_counter()
     logger.info(f"scan_csv setup took {t_scan_end - t_scan_start:.2f} seconds")
 
-    # 2. Apply LLM-driven column renames (if any)
-    if col_mapping:
-        q = q.rename(col_mapping)
-    
-    # 2.5. If important_only mode, select only important columns
+    # 2. If important_only mode, select only important columns, then rename them.
+    # Selecting by the file's own names right on the scan makes the projection
+    # explicit: the CSV reader only materializes these columns.
     if important_only:
         logger.info(f"Selecting only important columns: {IMPORTANT_COLUMNS}")
-        q = q.select(IMPORTANT_COLUMNS)
+        q = q.select([
+            pl.col(_source_column(col_mapping, col)).alias(col) for col in IMPORTANT_COLUMNS
+        ])
+    elif col_mapping:
+        # Apply LLM-driven column renames (if any)
+        q = q.rename(col_mapping)
 
-    # 3. Parse DATA_TIME to datetime (strip fractional seconds, truncate to minute)
-    q = q.with_columns(
-        [
-            pl.coalesce(
-                # Handle format with fractional seconds: "2025-08-02 00:30:00.4600000"
-                pl.col("DATA_TIME").str.replace(r"\.\d+$", "").str.strptime(
-                    pl.Datetime, format="%Y-%m-%d %H:%M:%S", strict=False
-                ),
-                # Standard format without fractional seconds
-                pl.col("DATA_TIME").str.strptime(
-                    pl.Datetime, format="%Y-%m-%d %H:%M:%S", strict=False
-                ),
-                # Date only
-                pl.col("DATA_TIME").str.strptime(
-                    pl.Datetime, format="%Y-%m-%d", strict=False
-                ),
-            ).dt.truncate("1m").alias("DATA_TIME"),  # Truncate to minute
-        ]
-    )
+    # Blank lines (e.g. at the end of a file) come back as rows of nulls; drop them
+    # so they don't reach BigQuery and rows_output matches count_csv_rows
+    q = q.filter(pl.any_horizontal(pl.all().is_not_null()))
+
+    # All transforms below go into ONE with_columns so Polars evaluates the column
+    # expressions in parallel instead of as sequential blocks. Expressions that need
+    # the parsed datetime reuse data_time_expr; common-subexpression elimination
+    # computes it once.
 
-    # 4. Add DATA_TIME_STR and QUARTER column
-    derived_cols = [
-        pl.col("DATA_TIME")
-        .dt.strftime("%Y-%m-%d %H:%M:%S")
-        .alias("DATA_TIME_STR"),
-    ]
+    # 3. Parse DATA_TIME to datetime (strip fractional seconds, truncate to minute)
+    if detect_data_time_format(probe_path, separator, col_mapping) is not None:
+        # The first row is zero-padded, so every layout the files use lines up by
+        # width: dates ("2025-08-02", 10 bytes) get a midnight time appended, and
+        # date-times are sliced to 19 chars, which drops fractional seconds
+        # ("2025-08-02 00:30:00.4600000"). Mixed rows then go through ONE strptime
+        # instead of being parsed once per candidate format.
+        normalized = (
+            pl.when(pl.col("DATA_TIME").str.len_bytes() == 10)
+            .then(pl.concat_str([pl.col("DATA_TIME"), pl.lit(" 00:00:00")]))
+            .otherwise(pl.col("DATA_TIME").str.slice(0, 19))
+        )
+        data_time_expr = normalized.str.strptime(
+            pl.Datetime, format="%Y-%m-%d %H:%M:%S", strict=False
+        )
+    else:
+        # Layout unknown: try the general formats in turn
+        data_time_expr = pl.coalesce(
+            # Date-time with or without fractional seconds. The regex (not a fixed
+            # slice) tolerates non-zero-padded widths here.
+            pl.col("DATA_TIME").str.replace(r"\.\d+$", "").str.strptime(
+                pl.Datetime, format="%Y-%m-%d %H:%M:%S", strict=False
+            ),
+            # Date only
+            pl.col("DATA_TIME").str.strptime(
+                pl.Datetime, format="%Y-%m-%d", strict=False
+            ),
+        )
+    data_time_expr = data_time_expr.dt.truncate("1m")  # Truncate to minute
+    exprs = [data_time_expr.alias("DATA_TIME")]
 
+    # 4. Add QUARTER column (derived from the parsed DATA_TIME; no string round-trip)
     if quarter_str and quarter_str != "UNKNOWN_QUARTER":
-        # Use constant quarter string if we already know it from get_file_quarter
-        derived_cols.append(pl.lit(quarter_str).alias("QUARTER"))
+        # Use constant quarter string if we already know it from get_file_quarter.
+        # Categorical keeps it as one dictionary entry instead of a repeated string;
+        # it is still written to Parquet (and loaded into BigQuery) as a string.
+        exprs.append(pl.lit(quarter_str).cast(pl.Categorical).alias("QUARTER"))
     else:
         # Fallback: derive per-row
-        derived_cols.append(
+        exprs.append(
             (
-                pl.col("DATA_TIME").dt.year().cast(pl.Utf8)
+                data_time_expr.dt.year().cast(pl.Utf8)
                 + "-Q"
-                + pl.col("DATA_TIME").dt.quarter().cast(pl.Utf8)
+                + data_time_expr.dt.quarter().cast(pl.Utf8)
             ).alias("QUARTER")
         )
 
-    q = q.with_columns(derived_cols)
-
-    # 5. Ensure numeric types for power columns
-    # Strip whitespace first, then cast to Float64
-    # Only cast columns that exist in the dataframe
-    power_columns_to_cast = ["IMPORT_ACTIVE_POWER"]
-    if not important_only:
-        # Add additional power columns only when processing full schema
-        power_columns_to_cast.extend([
-            "EXPORT_ACTIVE_POWER",
-            "IMPORT_REACTIVE_POWER",
-            "EXPORT_REACTIVE_POWER",
+    # 5. Ensure numeric types for numeric columns
+    # Already typed when read with numeric_overrides; otherwise they were scanned
+    # as Utf8, so strip whitespace and cast into typed copies first. nulled_q
+    # compares each copy with its raw value before the copy replaces it below.
+    # meter_id_expr is the typed METER_ID either way, for the hash below.
+    meter_id_expr = pl.col("METER_ID")
+    nulled_q = None
+    typed_cols = []
+    if not numeric_overrides:
+        logger.info("Numeric columns need whitespace stripping; casting from strings")
+        present = set(q.collect_schema().names())
+        cast_types = {col: dtype for col, dtype in numeric_types.items() if col in present}
+        typed_cols = [f"{col}{_TYPED_SUFFIX}" for col in cast_types]
+        q = q.with_columns([
+            pl.col(col).str.strip_chars().cast(dtype, strict=False).alias(f"{col}{_TYPED_SUFFIX}")
+            for col, dtype in cast_types.items()
         ])
-    
-    power_casts = [
-        pl.col(col).cast(pl.Utf8).str.strip_chars().cast(pl.Float64, strict=False)
-        for col in power_columns_to_cast
-    ]
-    q = q.with_columns(power_casts)
+        nulled_q = q.select([
+            (
+                (pl.col(col).str.strip_chars().str.len_bytes() > 0)
+                & pl.col(f"{col}{_TYPED_SUFFIX}").is_null()
+            ).sum().alias(col)
+            for col in cast_types
+        ]) if cast_types else None
+        if "METER_ID" in cast_types:
+            meter_id_expr = pl.col(f"METER_ID{_TYPED_SUFFIX}")
+        exprs.extend(pl.col(f"{col}{_TYPED_SUFFIX}").alias(col) for col in cast_types)
 
     # 6. Optional deterministic ROW_HASH (can be heavy on very large files)
-    # NOTE: ROW_HASH is based on METER_ID + DATA_TIME_STR only (natural key).
-    # This aligns with dbt deduplication logic in stg_meter_readings.sql which uses
-    # FARM_FINGERPRINT(CONCAT(METER_ID, DATA_TIME)). Including IMPORT_ACTIVE_POWER
-    # would cause records with same meter/time but different power values to be
-    # treated as distinct in BigQuery MERGE but duplicates in dbt.
-    logger.info(f"Row hash enabled: {ENABLE_ROW_HASH}")
-    if ENABLE_ROW_HASH:
-        q = q.with_columns(
-            [
-                (
-                    pl.concat_str(
-                        [
-                            pl.col("METER_ID").cast(pl.Utf8),
-                            pl.col("DATA_TIME_STR"),
-                        ]
-                    ).hash()
-                    % (2**63 - 1)
-                )
-                .cast(pl.Int64)
-                .alias("ROW_HASH")
-            ]
+    # NOTE: ROW_HASH is based on METER_ID + DATA_TIME only (natural key).
+    # This aligns with dbt deduplication logic in stg_meter_readings.sql, which
+    # partitions by ROW_HASH. Including IMPORT_ACTIVE_POWER would cause records with
+    # same meter/time but different power values to be treated as distinct in the
+    # BigQuery dedup INSERT but duplicates in dbt.
+    # "legacy" hashes the concatenated METER_ID and formatted DATA_TIME exactly as
+    # earlier loads did, so ROW_HASH values match rows already in BigQuery.
+    # "struct" hashes the typed columns directly (no concatenated string column, no
+    # modulo); the seed is pinned for determinism and the u64 hash is reinterpreted
+    # (not converted) as Int64 for BigQuery. Switching changes every hash, so loaded
+    # rows must be re-hashed first or they stop deduplicating against new loads.
+    # METER_ID is always read as Int64, so neither hash depends on how IDs look.
+    logger.info(f"Row hash enabled: {ENABLE_ROW_HASH} (algorithm: {ROW_HASH_ALGORITHM})")
+    if ENABLE_ROW_HASH and ROW_HASH_ALGORITHM == "legacy":
+        exprs.append(
+            (
+                pl.concat_str(
+                    [
+                        meter_id_expr.cast(pl.Utf8),
+                        data_time_expr.dt.strftime("%Y-%m-%d %H:%M:%S"),
+                    ]
+                ).hash()
+                % (2**63 - 1)
+            )
+            .cast(pl.Int64)
+            .alias("ROW_HASH")
+        )
+    elif ENABLE_ROW_HASH:
+        exprs.append(
+            pl.struct(
+                [
+                    meter_id_expr,
+                    data_time_expr,
+                ]
+            )
+            .hash(seed=0)
+            .reinterpret(signed=True)
+            .alias("ROW_HASH")
         )
 
-    return q
+    q = q.with_columns(exprs)
+    if typed_cols:
+        q = q.drop(typed_cols)
+
+    return q, nulled_q
 
 
 def count_csv_rows(filepath: str, separator: str = ",") -> int:
     """
     Counts the number of rows in a CSV file (excluding header).
-    Uses streaming to handle large files efficiently.
+    Counts newlines over large binary blocks (bytes.count runs in C) instead of
+    parsing every field, so the pre-pass costs one sequential read of the file.
+    Blank lines at the end of the file are not counted.
+
+    Limitation: a newline inside a quoted field is counted as a row break, so a
+    file with multi-line quoted values reports more rows than the CSV reader
+    produces (and rows_input exceeds rows_output in pipeline_stats).
     """
     try:
-        df = pl.scan_csv(
-            filepath,
-            separator=separator,
-            quote_char='"',
-            ignore_errors=True,
-            low_memory=True,
-        )
-        return df.select(pl.len()).collect().item()
+        newlines = 0
+        # Newlines after the last non-blank byte: the last row's terminator plus
+        # any trailing blank lines
+        trailing_newlines = 0
+        has_content = False
+        with open(filepath, "rb") as f:
+            while True:
+                buf = f.read(COUNT_ROWS_BLOCK_SIZE)
+                if not buf:
+                    break
+                newlines += buf.count(b"\n")
+                content = buf.rstrip(b" \t\r\n")
+                if content:
+                    has_content = True
+                    trailing_newlines = buf.count(b"\n", len(content))
+                else:
+                    trailing_newlines += buf.count(b"\n")
+        if not has_content:
+            return 0
+        # Lines up to and including the last non-blank one, minus the header
+        return max(newlines - trailing_newlines, 0)
     except Exception as e:
         logger.warning(f"Could not count CSV rows: {e}")
         return 0
 
 
+def parquet_footer_stats(path: str) -> dict:
+    """
+    Reads row count, DATA_TIME min/max and IMPORT_ACTIVE_POWER null count from the
+    Parquet footer (row-group statistics), without touching any column data.
+    A value is None when some row group has no statistics for it.
+    """
+    metadata = pq.ParquetFile(path).metadata
+    result = {"row_count": metadata.num_rows, "min_date": None, "max_date": None, "null_power": None}
+    if metadata.num_row_groups == 0:
+        return result
+
+    columns = {
+        metadata.row_group(0).column(j).path_in_schema: j
+        for j in range(metadata.num_columns)
+    }
+    time_idx = columns.get("DATA_TIME")
+    power_idx = columns.get("IMPORT_ACTIVE_POWER")
+
+    mins, maxs, nulls = [], [], []
+    for i in range(metadata.num_row_groups):
+        row_group = metadata.row_group(i)
+        if time_idx is not None:
+            stats = row_group.column(time_idx).statistics
+            if stats is not None and stats.has_min_max:
+                mins.append(stats.min)
+                maxs.append(stats.max)
+        if power_idx is not None:
+            stats = row_group.column(power_idx).statistics
+            if stats is not None and stats.has_null_count:
+                nulls.append(stats.null_count)
+
+    if mins and len(mins) == metadata.num_row_groups:
+        result["min_date"], result["max_date"] = min(mins), max(maxs)
+    if len(nulls) == metadata.num_row_groups:
+        result["null_power"] = sum(nulls)
+    return result
+
+
+def _combined_filename(input_paths: list[str]) -> str:
+    """
+    Stable name for a group of CSVs written to one Parquet file.
+    Derived from the member file names so a rerun over the same inputs overwrites
+    the same output instead of adding a duplicate.
+    """
+    names = sorted(os.path.basename(p) for p in input_paths)
+    digest = hashlib.sha256("|".join(names).encode("utf-8")).hexdigest()[:12]
+    return f"combined_{len(names)}_files_{digest}.csv"
+
+
+# Quarter output directories already created by this process
+_created_dirs: set[str] = set()
+
+
+def _sink_with_null_counts(
+    q: pl.LazyFrame, nulled_q: pl.LazyFrame | None, output_path: str, sink_kwargs: dict
+) -> dict:
+    """
+    Sinks q to output_path on the streaming engine. With a nulled_q (see
+    build_lazy_pipeline), both run in one collect_all so the CSV is scanned once,
+    and its per-column counts are returned; otherwise returns {}.
+    """
+    if nulled_q is None:
+        q.sink_parquet(output_path, engine="streaming", **sink_kwargs)
+        return {}
+    _, counts = pl.collect_all(
+        [q.sink_parquet(output_path, lazy=True, **sink_kwargs), nulled_q],
+        engine="streaming",
+    )
+    return counts.row(0, named=True)
+
+
 def process_file_streaming(
-    input_path: str, 
+    input_path: str | list[str], 
     output_dir: str, 
     col_mapping: dict, 
     important_only: bool = False,
     separator: str = ",",
     run_id: Optional[str] = None,
+    concurrent_jobs: int = 1,
 ) -> tuple[bool, Optional[StageStats]]:
     """
     Streams data from CSV to Parquet using a Polars lazy pipeline.
     The heavy work (read, transform, write) executes at sink_parquet.
     
     Args:
-        input_path: Path to input CSV file
+        input_path: Path to input CSV file, or a list of CSVs with the same layout
+            and quarter (scanned as one plan and written to one Parquet file)
         output_dir: Directory to write output Parquet files
         col_mapping: Dictionary mapping original column names to expected names
         important_only: If True, process only important columns
         separator: CSV separator character
         run_id: Optional DAG run ID for stats tracking
+        concurrent_jobs: ETL jobs running at once (they share the available memory)
     
     Returns:
         Tuple of (success: bool, stats: StageStats or None)
@@ -696,45 +1287,90 @@ def process_file_streaming(
     logger.info(f"Starting stream processing for {input_path}...")
     t0 = time.perf_counter()
     
-    filename = os.path.basename(input_path)
+    input_paths = [input_path] if isinstance(input_path, str) else list(input_path)
+    if len(input_paths) == 1:
+        input_path = input_paths[0]
+        filename = os.path.basename(input_path)
+    else:
+        filename = _combined_filename(input_paths)
+        logger.info(
+            f"Combining {len(input_paths)} files into {filename}: "
+            f"{[os.path.basename(p) for p in input_paths]}"
+        )
     if run_id is None:
         run_id = get_run_id()
     run_timestamp = datetime.now()
     
     # Get file size for stats
-    file_size_bytes = os.path.getsize(input_path) if os.path.exists(input_path) else 0
+    file_size_bytes = sum(os.path.getsize(p) for p in input_paths if os.path.exists(p))
     
     # Count input rows before processing
-    rows_input = count_csv_rows(input_path, separator)
+    rows_input = sum(count_csv_rows(p, separator) for p in input_paths)
     logger.info(f"Input file has {rows_input:,} rows")
 
     try:
         # 1. Determine Output Path based on Quarter
-        quarter_folder = get_file_quarter(input_path, col_mapping, separator)
+        quarter_folder = get_file_quarter(input_paths[0], col_mapping, separator)
         quarter_str = quarter_folder if quarter_folder != "UNKNOWN_QUARTER" else None
 
         target_dir = os.path.join(output_dir, quarter_folder)
-        os.makedirs(target_dir, exist_ok=True)
+        if target_dir not in _created_dirs:
+            os.makedirs(target_dir, exist_ok=True)
+            _created_dirs.add(target_dir)
 
         output_filename = filename.replace(".csv", ".parquet")
         output_path = os.path.join(target_dir, output_filename)
 
         logger.info("2")  # simple progress marker
-        q = build_lazy_pipeline(input_path, col_mapping, quarter_str, important_only, separator)
+        low_memory = use_low_memory(file_size_bytes, concurrent_jobs)
+        logger.info(f"Low-memory scan: {low_memory} (ETL_LOW_MEMORY_MODE={LOW_MEMORY_MODE})")
+        q, nulled_q = build_lazy_pipeline(
+            input_path, col_mapping, quarter_str, important_only, separator, low_memory
+        )
         logger.info("3")  # after building lazy pipeline
 
         # 2. Sink to Parquet (this executes the whole lazy plan)
         logger.info("4")
         logger.info(
-            f"Starting sink_parquet to {output_path} with compression={PARQUET_COMPRESSION}, "
-            f"row_group_size={ROW_GROUP_SIZE}"
+            f"Starting sink_parquet to {output_path} with compression={PARQUET_COMPRESSION} "
+            f"(level {PARQUET_COMPRESSION_LEVEL}), row_group_size={ROW_GROUP_SIZE}"
         )
         t_sink_start = time.perf_counter()
-        q.sink_parquet(
-            output_path,
+        sink_kwargs = dict(
             compression=PARQUET_COMPRESSION,
+            # Only zstd/gzip/brotli take a level; Polars rejects it for the others
+            compression_level=(
+                PARQUET_COMPRESSION_LEVEL
+                if PARQUET_COMPRESSION in ("zstd", "gzip", "brotli")
+                else None
+            ),
+            statistics=True,
             row_group_size=ROW_GROUP_SIZE,
+            data_page_size=PARQUET_DATA_PAGE_SIZE,
+            # Row order doesn't matter downstream (dedup is by ROW_HASH)
+            maintain_order=False,
         )
+        # Run on the streaming engine so peak memory is bounded by batch size,
+        # not file size
+        try:
+            nulled = _sink_with_null_counts(q, nulled_q, output_path, sink_kwargs)
+        except pl.exceptions.ComputeError as e:
+            if nulled_q is not None:
+                raise
+            # The CSV reader hit a value it can't parse as a number; re-read the
+            # numeric columns as strings so bad values are nulled and counted
+            logger.warning(
+                "CSV reader rejected a numeric value, casting from strings instead: "
+                f"{str(e).splitlines()[0]}"
+            )
+            q, nulled_q = build_lazy_pipeline(
+                input_path, col_mapping, quarter_str, important_only, separator, low_memory,
+                numeric_in_scan=False,
+            )
+            nulled = _sink_with_null_counts(q, nulled_q, output_path, sink_kwargs)
+        for col, count in nulled.items():
+            if count:
+                logger.warning(f"{count:,} non-empty {col} values could not be cast and were written as NULL")
         t_sink_end = time.perf_counter()
         logger.info(f"sink_parquet execution took {t_sink_end - t_sink_start:.2f} seconds")
 
@@ -742,25 +1378,9 @@ def process_file_streaming(
         if not os.path.exists(output_path):
             raise RuntimeError(f"Parquet file was not created at {output_path}")
 
-        # Read parquet to collect stats
-        df_stats = pl.scan_parquet(output_path)
-        
-        # Collect various stats in one pass
-        stats_result = df_stats.select([
-            pl.len().alias("row_count"),
-            pl.col("METER_ID").n_unique().alias("unique_meters"),
-            pl.col("DATA_TIME").min().alias("min_date"),
-            pl.col("DATA_TIME").max().alias("max_date"),
-            pl.col("IMPORT_ACTIVE_POWER").is_null().sum().alias("null_power"),
-            (pl.col("IMPORT_ACTIVE_POWER") == 0).sum().alias("zero_power"),
-        ]).collect()
-        
-        row_count = stats_result["row_count"][0]
-        unique_meters = stats_result["unique_meters"][0]
-        min_date = stats_result["min_date"][0]
-        max_date = stats_result["max_date"][0]
-        null_power = stats_result["null_power"][0]
-        zero_power = stats_result["zero_power"][0]
+        # Row count, date range and null count come from the footer statistics
+        footer = parquet_footer_stats(output_path)
+        row_count = footer["row_count"]
 
         if row_count == 0:
             # Remove the empty file to avoid downstream confusion
@@ -771,6 +1391,27 @@ def process_file_streaming(
                 "(e.g., date range mismatch, filter eliminating all rows, or corrupt source data)."
             )
 
+        # Only what the footer can't answer is computed from the column data
+        stats_exprs = [
+            pl.col("METER_ID").n_unique().alias("unique_meters"),
+            (pl.col("IMPORT_ACTIVE_POWER") == 0).sum().alias("zero_power"),
+        ]
+        if footer["min_date"] is None:
+            stats_exprs += [
+                pl.col("DATA_TIME").min().alias("min_date"),
+                pl.col("DATA_TIME").max().alias("max_date"),
+            ]
+        if footer["null_power"] is None:
+            stats_exprs.append(pl.col("IMPORT_ACTIVE_POWER").is_null().sum().alias("null_power"))
+        stats_result = pl.scan_parquet(output_path).select(stats_exprs).collect().row(0, named=True)
+        footer.update(stats_result)
+
+        unique_meters = footer["unique_meters"]
+        min_date = footer["min_date"]
+        max_date = footer["max_date"]
+        null_power = footer["null_power"]
+        zero_power = footer["zero_power"]
+
         logger.info(f"Validated: {row_count:,} rows written to parquet file")
         logger.info(f"Success! Processed data saved to {output_path}")
         logger.info("Completed Streaming")
@@ -827,7 +1468,117 @@ def process_file_streaming(
 # =========================
 
 # Path to save ETL stats for cloud_loader to read
-STATS_OUTPUT_PATH = os.path.join(OUTPUT_DIR, "_etl_stats.json")
+STATS_OUTPUT_PATH = os.path.join(OUTPUT_DIR, "_etl_stats.feather")
+
+
+def plan_files(input_files: list[str]) -> tuple[bool, list[tuple[str, dict]]]:
+    """
+    Reads every CSV's headers and resolves the schema mapping once per distinct
+    header layout (separator + headers), so files from the same feed share one
+    deterministic/LLM decision instead of asking again per file. Distinct layouts
+    are resolved concurrently, so several LLM calls overlap instead of queueing.
+    Files with unreadable headers are skipped. A schema failure fails the run.
+    Returns (success, [(file, plan), ...]).
+    """
+    # 1. Read Headers (auto-detects separator)
+    layouts: list[tuple[str, tuple]] = []
+    first_file: dict[tuple, str] = {}
+    for input_file in input_files:
+        filename = os.path.basename(input_file)
+        logger.info(f"Processing {filename}...")
+
+        current_headers, separator = get_csv_headers(input_file)
+        if not current_headers:
+            logger.error(f"Skipping {filename} due to missing/invalid headers.")
+            continue
+
+        signature = (separator, tuple(current_headers))
+        if signature in first_file:
+            logger.info(f"Reusing schema mapping for {filename} (same headers as an earlier file)")
+        else:
+            first_file[signature] = filename
+        layouts.append((input_file, signature))
+
+    # 2. Validate schema (deterministic first, then LLM), once per layout
+    def resolve(signature: tuple) -> dict:
+        separator, headers = signature
+        schema_result = determine_schema_mapping(list(headers), EXPECTED_HEADERS)
+        logger.info(
+            f"Schema analysis for {first_file[signature]}: "
+            f"{schema_result.get('reason', 'No reason provided')}"
+        )
+        return {
+            "headers": list(headers),
+            "separator": separator,
+            "mapping": schema_result.get("mapping", {}),
+            "important_only": schema_result.get("important_only", False),
+        }
+
+    decisions: dict[tuple, dict] = {}
+    if first_file:
+        with ThreadPoolExecutor(
+            max_workers=min(SCHEMA_RESOLVE_WORKERS, len(first_file))
+        ) as executor:
+            futures = {executor.submit(resolve, sig): sig for sig in first_file}
+            for future in as_completed(futures):
+                signature = futures[future]
+                try:
+                    decisions[signature] = future.result()
+                except Exception as e:
+                    logger.error(f"Schema validation failed for {first_file[signature]}: {e}")
+                    # Fail so Airflow marks the task as failed
+                    for pending in futures:
+                        pending.cancel()
+                    return False, []
+
+    planned = [(input_file, decisions[signature]) for input_file, signature in layouts]
+    logger.info(f"Resolved {len(decisions)} distinct header layouts for {len(planned)} files")
+    return True, planned
+
+
+def _process_one(
+    input_files: list[str], run_id: str, plan: dict, concurrent_jobs: int = 1
+) -> tuple[bool, Optional[StageStats]]:
+    """
+    Runs the streaming ETL for one CSV, or for a group of CSVs planned together.
+    Module-level so it can run in a worker process.
+    Returns (success, stats).
+    """
+    # 3. Process file(s) with streaming pipeline
+    success, stats = process_file_streaming(
+        input_files if len(input_files) > 1 else input_files[0],
+        OUTPUT_DIR,
+        plan["mapping"],
+        plan["important_only"],
+        plan["separator"],
+        run_id,
+        concurrent_jobs,
+    )
+    if not success:
+        logger.error(f"ETL failed for {stats.source_filename if stats else input_files}.")
+    return success, stats
+
+
+def _group_files(planned: list[tuple[str, dict]]) -> list[tuple[list[str], dict]]:
+    """
+    Groups planned CSVs that can share one scan_csv: same headers, separator,
+    mapping and quarter. Each group becomes one lazy plan and one Parquet file.
+    Returns [(files, plan), ...].
+    """
+    groups: dict[tuple, tuple[list[str], dict]] = {}
+    for input_file, plan in planned:
+        quarter = get_file_quarter(input_file, plan["mapping"], plan["separator"])
+        key = (
+            quarter,
+            plan["separator"],
+            tuple(plan["headers"]),
+            plan["important_only"],
+            tuple(sorted(plan["mapping"].items())),
+        )
+        groups.setdefault(key, ([], plan))[0].append(input_file)
+
+    logger.info(f"Grouped {len(planned)} files into {len(groups)} combined pipelines")
+    return list(groups.values())
 
 
 def main() -> int:
@@ -849,7 +1600,11 @@ def main() -> int:
         os.makedirs(OUTPUT_DIR, exist_ok=True)
 
     # Find all CSV files
-    input_files = glob.glob(os.path.join(INPUT_DIR, "*.csv"))
+    with os.scandir(INPUT_DIR) as entries:
+        input_files = sorted(
+            entry.path for entry in entries
+            if entry.name.endswith(".csv") and entry.is_file()
+        )
 
     if not input_files:
         logger.warning(f"No CSV files found in {INPUT_DIR}")
@@ -860,47 +1615,71 @@ def main() -> int:
     # Collect stats for all files
     all_stats: list[StageStats] = []
 
-    for input_file in input_files:
-        filename = os.path.basename(input_file)
-        logger.info(f"Processing {filename}...")
+    success, planned = plan_files(input_files)
+    if not success:
+        logger.error("ETL failed for at least one file. Aborting run.")
+        _save_stats_to_file(all_stats)
+        return 1
 
-        # 1. Read Headers (auto-detects separator)
-        current_headers, separator = get_csv_headers(input_file)
-        if not current_headers:
-            logger.error(f"Skipping {filename} due to missing/invalid headers.")
-            continue
+    if COMBINE_FILES:
+        groups = _group_files(planned)
+        jobs = [files for files, _ in groups]
+        plans = [plan for _, plan in groups]
+    else:
+        jobs = [[input_file] for input_file, _ in planned]
+        plans = [plan for _, plan in planned]
 
-        # 2. Validate schema (deterministic first, then LLM)
-        try:
-            schema_result = determine_schema_mapping(current_headers, EXPECTED_HEADERS)
-        except Exception as e:
-            logger.error(f"Schema validation failed for {filename}: {e}")
-            # Fail fast so Airflow marks the task as failed
-            return 1
+    workers = ETL_MAX_WORKERS or max(1, (os.cpu_count() or 1) // 2)
+    workers = min(workers, len(jobs))
 
+    if workers > 1:
+        # Each worker is a separate Polars engine; split the cores between them so
+        # they don't oversubscribe. Spawned children read this env before importing
+        # polars (fork is unsafe once Polars' thread pool exists).
+        os.environ["POLARS_MAX_THREADS"] = str(max(1, (os.cpu_count() or 1) // workers))
         logger.info(
-            f"Schema analysis for {filename}: "
-            f"{schema_result.get('reason', 'No reason provided')}"
+            f"Processing files with {workers} worker processes "
+            f"({os.environ['POLARS_MAX_THREADS']} Polars threads each)"
         )
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = [
+                executor.submit(_process_one, files, run_id, plan, workers)
+                for files, plan in zip(jobs, plans)
+            ]
+            results = []
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                results.append(future.result())
+                logger.info(f"Finished {len(results)}/{len(futures)} ETL jobs")
+                if not results[-1][0]:
+                    # Fail fast: drop jobs that haven't started; running ones finish
+                    for pending in futures:
+                        pending.cancel()
+    else:
+        results = []
+        for files, plan in zip(jobs, plans):
+            results.append(_process_one(files, run_id, plan))
+            if not results[-1][0]:
+                # Fail fast when running serially
+                break
 
-        mapping = schema_result.get("mapping", {})
-        important_only = schema_result.get("important_only", False)
-
-        # 3. Process file with streaming pipeline
-        success, stats = process_file_streaming(
-            input_file, OUTPUT_DIR, mapping, important_only, separator, run_id
-        )
-        
+    failed = False
+    for success, stats in results:
         if stats:
             all_stats.append(stats)
-        
         if not success:
-            logger.error(f"ETL failed for {filename}. Aborting run.")
-            # Save stats even on failure for debugging
-            _save_stats_to_file(all_stats)
-            return 1
+            failed = True
+
+    if failed:
+        logger.error("ETL failed for at least one file. Aborting run.")
+        # Save stats even on failure for debugging
+        _save_stats_to_file(all_stats)
+        return 1
 
-    # Save stats to JSON file for cloud_loader to read
+    # Save stats to feather file for cloud_loader to read
     _save_stats_to_file(all_stats)
     
     logger.info("All files processed successfully.")
@@ -908,11 +1687,12 @@ def main() -> int:
 
 
 def _save_stats_to_file(stats_list: list[StageStats]) -> None:
-    """Save stats to a JSON file for the cloud_loader to read."""
+    """Save stats to an Arrow IPC (feather) file for the cloud_loader to read."""
     try:
-        stats_data = [s.to_bq_row() for s in stats_list]
-        with open(STATS_OUTPUT_PATH, "w") as f:
-            json.dump(stats_data, f, indent=2, default=str)
+        # Arrow IPC keeps column types (run_timestamp stays a timestamp), so the
+        # loader can read it back without re-parsing strings
+        table = pa.Table.from_pylist([asdict(s) for s in stats_list])
+        feather.write_feather(table, STATS_OUTPUT_PATH, compression="zstd")
         logger.info(f"Saved {len(stats_list)} ETL stats records to {STATS_OUTPUT_PATH}")
     except Exception as e:
         logger.error(f"Failed to save stats to file: {e}")
@@ -1,5 +1,7 @@
-import pandas as pd
+import polars as pl
 import os
+import tempfile
+from datetime import datetime
 from google.cloud import bigquery
 import logging
 
@@ -14,29 +16,37 @@ CREDENTIALS_PATH = "include/gcp_adc.json"
 
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = CREDENTIALS_PATH
 
+# Column name cleanup in one pass: spaces -> "_", parentheses dropped
+_CLEAN_COLUMN_TABLE = str.maketrans({" ": "_", "(": "", ")": ""})
+
 def load_excel_to_bq(file_path, table_name):
     logger.info(f"Processing {file_path} -> {table_name}...")
     try:
-        # Read Excel
-        df = pd.read_excel(file_path)
+        # Read Excel (calamine: Rust xlsx reader)
+        df = pl.read_excel(file_path, engine="calamine")
         
         # Clean column names (remove spaces, special chars)
-        df.columns = [c.strip().replace(" ", "_").replace("(", "").replace(")", "").upper() for c in df.columns]
+        df.columns = [c.strip().translate(_CLEAN_COLUMN_TABLE).upper() for c in df.columns]
         
         # Add load timestamp
-        df["_LOADED_AT"] = pd.Timestamp.now()
+        df = df.with_columns(pl.lit(datetime.now()).alias("_LOADED_AT"))
 
         # Load to BigQuery
         full_table_id = f"{PROJECT_ID}.{DATASET_ID}.{table_name}"
         
         client = bigquery.Client(project=PROJECT_ID)
         job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.PARQUET, # Schema comes from the Parquet file
             write_disposition="WRITE_TRUNCATE", # Overwrite existing reference data
-            autodetect=True,
         )
         
-        job = client.load_table_from_dataframe(df, full_table_id, job_config=job_config)
-        job.result() # Wait for completion
+        # Stage as Parquet so BigQuery gets typed columns without a pandas round-trip
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            parquet_path = os.path.join(tmp_dir, f"{table_name}.parquet")
+            df.write_parquet(parquet_path)
+            with open(parquet_path, "rb") as f:
+                job = client.load_table_from_file(f, full_table_id, job_config=job_config)
+            job.result() # Wait for completion
         
         logger.info(f"Successfully loaded {len(df)} rows to {full_table_id}")
         return True
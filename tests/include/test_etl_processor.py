@@ -0,0 +1,143 @@
+"""Tests for the deterministic helpers in include/etl_processor.py."""
+
+import os
+import sys
+from datetime import datetime
+
+import polars as pl
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "include"))
+
+from etl_processor import (  # noqa: E402
+    EXPECTED_HEADERS,
+    build_lazy_pipeline,
+    count_csv_rows,
+    fuzzy_header_match,
+    try_normalized_full_mapping,
+    validate_and_fix_mapping,
+)
+
+
+def test_fuzzy_header_match_fixes_typo():
+    """A misspelled header is matched to the expected column it resembles."""
+    headers = ["METER_ID", "DATA_TIME", "IMPRT_ACTIVE_POWER"]
+    assert fuzzy_header_match("IMPORT_ACTIVE_POWER", headers, set()) == "IMPRT_ACTIVE_POWER"
+
+
+def test_fuzzy_header_match_rejects_other_expected_column():
+    """Headers that are really a different expected column are never taken."""
+    for header in ["EXPORT_ACTIVE_POWER", "IMPORT_REACTIVE_POWER"]:
+        assert fuzzy_header_match("IMPORT_ACTIVE_POWER", ["METER_ID", header], set()) is None
+
+
+def test_fuzzy_header_match_skips_taken_headers():
+    """Headers already mapped to another column are not offered again."""
+    headers = ["METER_ID", "IMPRT_ACTIVE_POWER"]
+    assert fuzzy_header_match("IMPORT_ACTIVE_POWER", headers, {"IMPRT_ACTIVE_POWER"}) is None
+
+
+def test_fuzzy_header_match_below_cutoff():
+    """Dissimilar headers don't match."""
+    assert fuzzy_header_match("IMPORT_ACTIVE_POWER", ["METER_ID", "STATUS"], set()) is None
+
+
+def test_fuzzy_header_match_query_keeps_guard():
+    """Matching by another name still rejects headers closer to a different column."""
+    headers = ["METER_ID", "IMPORT_REACTIVE_POWER"]
+    match = fuzzy_header_match(
+        "IMPORT_ACTIVE_POWER", headers, set(), query="IMPORT_ACTIVE_PWR"
+    )
+    assert match is None
+
+
+def test_try_normalized_full_mapping_fixes_case_and_punctuation():
+    """Headers differing only in case/punctuation map without an LLM."""
+    headers = ["Meter Id"] + EXPECTED_HEADERS[1:]
+    assert try_normalized_full_mapping(headers, EXPECTED_HEADERS) == {"Meter Id": "METER_ID"}
+
+
+def test_try_normalized_full_mapping_exact_headers():
+    """Exact headers need no renames."""
+    assert try_normalized_full_mapping(list(EXPECTED_HEADERS), EXPECTED_HEADERS) == {}
+
+
+def test_try_normalized_full_mapping_missing_column():
+    """A missing expected column means no full mapping."""
+    assert try_normalized_full_mapping(EXPECTED_HEADERS[:-1], EXPECTED_HEADERS) is None
+
+
+def test_try_normalized_full_mapping_unknown_column():
+    """An unknown extra header means no full mapping."""
+    headers = EXPECTED_HEADERS + ["SOMETHING_ELSE"]
+    assert try_normalized_full_mapping(headers, EXPECTED_HEADERS) is None
+
+
+def test_try_normalized_full_mapping_duplicate_target():
+    """Two headers normalizing to the same expected column mean no full mapping."""
+    headers = EXPECTED_HEADERS + ["Meter Id"]
+    assert try_normalized_full_mapping(headers, EXPECTED_HEADERS) is None
+
+
+def test_validate_and_fix_mapping_does_not_take_other_power_column():
+    """An invented LLM name is not remapped onto a different real power column."""
+    headers = ["METER_ID", "DATA_TIME", "IMPORT_REACTIVE_POWER"]
+    mapping = {"IMPORT_ACTIVE_PWR": "IMPORT_ACTIVE_POWER"}
+    assert validate_and_fix_mapping(mapping, headers) == {}
+
+
+def test_validate_and_fix_mapping_maps_each_header_once():
+    """Two LLM names never map onto the same CSV header."""
+    headers = ["METER_ID", "DATA_TIME", "IMPRT_ACTIVE_POWER"]
+    mapping = {
+        "IMPRT_ACTIVE_POWER": "IMPORT_ACTIVE_POWER",
+        "IMPORT_ACTIVE_POWR": "IMPORT_ACTIVE_POWER",
+        "data_time": "DATA_TIME",
+    }
+    assert validate_and_fix_mapping(mapping, headers) == {
+        "IMPRT_ACTIVE_POWER": "IMPORT_ACTIVE_POWER",
+        "DATA_TIME": "DATA_TIME",
+    }
+
+
+def test_build_lazy_pipeline_parses_mixed_data_time_layouts(tmp_path):
+    """Rows in a different layout than the probed first row still parse."""
+    path = tmp_path / "mixed.csv"
+    path.write_text(
+        "METER_ID,DATA_TIME,IMPORT_ACTIVE_POWER\n"
+        "1,2025-08-02 00:30:00.4600000,1.5\n"
+        "2,2025-08-03,2.5\n"
+        "3,2025-08-04 12:15:59,3.5\n"
+        "4,not a date,4.5\n"
+    )
+    q, _ = build_lazy_pipeline(str(path), {}, None, important_only=True)
+    df = q.collect()
+    assert df["DATA_TIME"].to_list() == [
+        datetime(2025, 8, 2, 0, 30),
+        datetime(2025, 8, 3, 0, 0),
+        datetime(2025, 8, 4, 12, 15),
+        None,
+    ]
+
+
+def test_build_lazy_pipeline_counts_values_nulled_by_cast(tmp_path):
+    """Values the numeric cast rejects are counted; empty cells are not."""
+    path = tmp_path / "padded.csv"
+    path.write_text(
+        "METER_ID,DATA_TIME,IMPORT_ACTIVE_POWER\n"
+        " 1,2025-08-02 00:30:00, 1.5\n"
+        "2,2025-08-02 00:45:00,bad\n"
+        "x,2025-08-02 01:00:00,\n"
+    )
+    q, nulled_q = build_lazy_pipeline(str(path), {}, None, important_only=True)
+    df, nulled = pl.collect_all([q, nulled_q])
+    assert df["IMPORT_ACTIVE_POWER"].to_list() == [1.5, None, None]
+    assert nulled.row(0, named=True) == {"METER_ID": 1, "IMPORT_ACTIVE_POWER": 1}
+
+
+def test_count_csv_rows_ignores_trailing_blank_lines(tmp_path):
+    """Blank lines after the last row are not counted; a missing final newline is."""
+    path = tmp_path / "rows.csv"
+    path.write_bytes(b"METER_ID,DATA_TIME\r\n1,2025-08-02\r\n2,2025-08-03\r\n\r\n\n")
+    assert count_csv_rows(str(path)) == 2
+    path.write_bytes(b"METER_ID,DATA_TIME\n1,2025-08-02\n2,2025-08-03")
+    assert count_csv_rows(str(path)) == 2